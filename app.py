@@ -1,28 +1,213 @@
-from flask import Flask, jsonify, send_from_directory, request
+from dotenv import load_dotenv
+load_dotenv()
+
+from flask import Flask, jsonify, request, Response, g, stream_with_context
 from flask_cors import CORS
 import os
 import json
-from pathlib import Path
-from whitehouse_feed import run_main
+import time
+from jobs import refresh_jobs, JobConflict
+from feed_cache import FeedCache, choose_encoding
+from post_store import store
+from feed_events import feed_events
+import metrics
+from datetime import datetime, timezone
 
 app = Flask(__name__, static_folder="public")
 CORS(app)
 
+feed_cache = FeedCache(store)
+
+# SSE streams close after this long so idle clients reconnect (with Last-Event-ID)
+FEED_STREAM_SECONDS = float(os.environ.get("FEED_STREAM_SECONDS", "300"))
+FEED_STREAM_KEEPALIVE = float(os.environ.get("FEED_STREAM_KEEPALIVE", "15"))
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    # Label by route pattern, not raw path, to keep series bounded
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.inc("http_requests_total", route=route, method=request.method, status=response.status_code)
+    if "request_started" in g:
+        metrics.observe("http_request_seconds", time.perf_counter() - g.request_started, route=route)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/')
 def home():
     return "White House Feed Backend Running."
 
+def run_main(progress, only_due=False):
+    # The ingestion and LLM stack (openai, dateutil, ...) is imported on the
+    # first refresh, so a cold start serves /feed without loading it
+    from whitehouse_feed import run_main
+    return run_main(progress, only_due=only_due)
+
+def job_response(job, coalesced, message):
+    return jsonify({
+        "status": message,
+        "job_id": job["id"],
+        "coalesced": coalesced,
+        "job_url": f"/jobs/{job['id']}"
+    }), 202
+
+def conflict_response(e):
+    return jsonify({
+        "error": f"{e}; try again when it finishes.",
+        "job_id": e.job["id"],
+        "job_url": f"/jobs/{e.job['id']}"
+    }), 409
+
 @app.route('/run-feed', methods=['GET', 'POST'])
 def run_feed():
-    run_main()
-    return jsonify({"status": "Feed generated successfully."})
+    # ?due=1 polls only the sources whose schedule says they're due
+    only_due = request.args.get("due") in ("1", "true")
+    try:
+        job, coalesced = refresh_jobs.trigger(
+            lambda progress: run_main(progress, only_due=only_due), kind="due" if only_due else "refresh"
+        )
+    except JobConflict as e:
+        # A full refresh can't join a due-only one: sources that weren't due would go unpolled
+        return conflict_response(e)
+    return job_response(job, coalesced, "Feed refresh started.")
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = refresh_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
 
 @app.route('/feed', methods=['GET'])
 def get_feed():
     try:
-        return send_from_directory(app.static_folder, "summarized_feed.json")
-    except FileNotFoundError:
-        return jsonify({"error": "Feed file not found"}), 404
+        bodies, digest = feed_cache.current()
+    except Exception as e:
+        return jsonify({"error": f"Failed to read feed: {e}"}), 500
+
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"), bodies)
+    etag = f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache"
+    }
+
+    # Any representation of the current feed counts as a match
+    if digest in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(bodies[encoding], mimetype="application/json", headers=headers)
+
+def parse_time_param(value):
+    # Accepts ISO 8601 (as in post timestamps) or epoch seconds
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+@app.route('/content/<digest>', methods=['GET'])
+def get_content(digest):
+    # Content-addressed, so a hash always names the same text
+    if request.headers.get("If-None-Match") == f'"{digest}"':
+        return Response(status=304)
+    try:
+        text = store.content(digest)
+    except Exception as e:
+        return jsonify({"error": f"Failed to read content: {e}"}), 500
+    if text is None:
+        return jsonify({"error": "Content not found"}), 404
+    return Response(text, mimetype="text/plain", headers={
+        "ETag": f'"{digest}"',
+        "Cache-Control": "public, max-age=31536000, immutable"
+    })
+
+@app.route('/feed/query', methods=['GET'])
+def query_feed():
+    args = request.args
+    try:
+        limit = min(max(int(args.get("limit", 50)), 1), 200)
+        since = parse_time_param(args.get("since"))
+        until = parse_time_param(args.get("until"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    try:
+        posts, next_cursor = store.query(
+            source=args.get("source"),
+            tag=args.get("tag"),
+            sentiment=args.get("sentiment"),
+            since=since,
+            until=until,
+            cursor=args.get("cursor"),
+            limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to query feed: {e}"}), 500
+
+    return jsonify({"posts": posts, "count": len(posts), "next_cursor": next_cursor})
+
+@app.route('/feed/changes', methods=['GET'])
+def feed_changes():
+    try:
+        limit = min(max(int(request.args.get("limit", 500)), 1), 2000)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    events, cursor, resync = feed_events.since(request.args.get("since"), limit=limit)
+    body = {"events": events, "cursor": cursor, "resync": resync}
+    if resync:
+        # Unknown or expired cursor: hand back the whole feed to start over from
+        try:
+            body["feed"] = store.projection()
+        except Exception as e:
+            return jsonify({"error": f"Failed to read feed: {e}"}), 500
+    return jsonify(body)
+
+def sse(event_type, event_id, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/feed/stream', methods=['GET'])
+def feed_stream():
+    cursor = request.headers.get("Last-Event-ID") or request.args.get("since")
+
+    def generate(cursor):
+        deadline = time.monotonic() + FEED_STREAM_SECONDS
+        yield "retry: 5000\n\n"
+        while True:
+            events, cursor, resync = feed_events.since(cursor)
+            if resync:
+                yield sse("resync", cursor, {"cursor": cursor})
+            for event in events:
+                yield sse(event["type"], event["id"], event)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not events and not resync:
+                yield ": keepalive\n\n"
+            feed_events.wait(cursor, timeout=min(FEED_STREAM_KEEPALIVE, remaining))
+
+    return Response(
+        stream_with_context(generate(cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.route('/reset-and-run-feed', methods=['POST'])
 def reset_and_run_feed():
@@ -31,43 +216,36 @@ def reset_and_run_feed():
         return jsonify({"error": "Unauthorized"}), 403
 
     json_path = os.path.join(app.static_folder, "summarized_feed.json")
-    try:
+
+    def reset_and_run(progress):
+        # Clearing inside the job keeps it from racing a refresh in flight
+        store.clear_posts()
+        feed_events.publish_reset()
         if os.path.exists(json_path):
             os.remove(json_path)
-            print("🗑️ Old summarized_feed.json deleted.")
-    except Exception as e:
-        return jsonify({"error": f"Failed to delete file: {e}"}), 500
+        print("🗑️ Old feed cleared.")
+        run_main(progress)
 
-    run_main()
-    return jsonify({"status": "Feed reset and regenerated successfully."})
+    try:
+        job, coalesced = refresh_jobs.trigger(reset_and_run, kind="reset")
+    except JobConflict as e:
+        # Joining a plain refresh would report a reset that never happens
+        return conflict_response(e)
+    return job_response(job, coalesced, "Feed reset and refresh started.")
 
 @app.route("/clean-feed", methods=["GET"])
 def clean_feed():
-    json_path = Path("public/summarized_feed.json")
-    if not json_path.exists():
-        return jsonify({"error": "Feed file not found"}), 404
-
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        removed, remaining = store.purge_sources("DoD")
+        store.export_json()
     except Exception as e:
-        return jsonify({"error": f"Failed to parse JSON: {e}"}), 500
-
-    original_len = len(data.get("posts", []))
-    filtered_posts = [p for p in data["posts"] if not p["source"].startswith("DoD")]
-    removed = original_len - len(filtered_posts)
-    data["posts"] = filtered_posts
-
-    try:
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        return jsonify({"error": f"Failed to write cleaned feed: {e}"}), 500
+        return jsonify({"error": f"Failed to clean feed: {e}"}), 500
+    feed_events.publish_changes(removed=removed)
 
     return jsonify({
         "status": "success",
-        "removed": removed,
-        "remaining": len(filtered_posts)
+        "removed": len(removed),
+        "remaining": remaining
     }), 200
 
 @app.route('/delete-post', methods=['POST'])
@@ -82,42 +260,14 @@ def delete_post():
     if not link_to_delete:
         return jsonify({"error": "Missing 'link' parameter"}), 400
 
-    json_path = Path("public/summarized_feed.json")
-    if not json_path.exists():
-        return jsonify({"error": "Feed file not found"}), 404
-
     try:
-        # Load and filter summarized feed
-        with open(json_path, "r", encoding="utf-8") as f:
-            feed = json.load(f)
-
-        original_len = len(feed.get("posts", []))
-        feed["posts"] = [p for p in feed["posts"] if p["link"] != link_to_delete]
-
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(feed, f, indent=4, ensure_ascii=False)
-
-        removed = original_len - len(feed["posts"])
-
-        # Append to deleted_links.json
-        deleted_links_path = Path("public/deleted_links.json")
-        try:
-            if deleted_links_path.exists():
-                with open(deleted_links_path, "r", encoding="utf-8") as f:
-                    deleted_links = json.load(f)
-            else:
-                deleted_links = []
-
-            if link_to_delete not in deleted_links:
-                deleted_links.append(link_to_delete)
-                with open(deleted_links_path, "w", encoding="utf-8") as f:
-                    json.dump(deleted_links, f, indent=2)
-
-        except Exception as e:
-            return jsonify({"error": f"Failed to update deleted_links.json: {e}"}), 500
-
+        # Removes the post and records the tombstone in one transaction
+        removed = store.delete_post(link_to_delete)
+        # Even when no post was removed, the tombstone is new
+        store.export_json()
+        if removed:
+            feed_events.publish_changes(removed=[link_to_delete])
         return jsonify({"status": "success", "removed": removed}), 200
-
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -131,10 +281,10 @@ def restore_feed():
     if not isinstance(data, list):
         return jsonify({"error": "Invalid data format: must be a JSON array"}), 400
 
-    json_path = Path("public/summarized_feed.json")
     try:
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        store.restore(data)
+        store.export_json()
+        feed_events.publish_reset()
         return jsonify({"status": "Feed restored successfully"}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to write feed: {e}"}), 500
@@ -145,14 +295,8 @@ def backup_feed():
     if token != os.environ.get("DELETE_TOKEN"):
         return jsonify({"error": "Unauthorized"}), 403
 
-    json_path = Path("public/summarized_feed.json")
-    if not json_path.exists():
-        return jsonify({"error": "Feed file not found"}), 404
-
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return jsonify(data)
+        return jsonify(store.projection())
     except Exception as e:
         return jsonify({"error": f"Failed to read feed: {e}"}), 500
 
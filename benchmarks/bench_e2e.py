@@ -0,0 +1,235 @@
+"""Benchmark: run_main and the app routes end to end, fully offline.
+
+Starts benchmarks.standins (RSS feeds, article pages, the tweets API and
+OpenAI chat completions on one local server), points every source and client
+at it, and runs the pipeline in a throwaway working directory through:
+
+    cold   empty store and caches, one /run-feed
+    warm   nothing upstream changed, one /run-feed
+    burst  new items on every source, concurrent /run-feed triggers while
+           clients hammer /feed, then a handful of /delete-post calls
+
+For each scenario it reports wall time, upstream calls (with 304s and
+errors), bytes served by the stand-ins, OpenAI tokens, /feed latency and
+peak Python memory.
+
+    python -m benchmarks.bench_e2e
+    python -m benchmarks.bench_e2e --latency 0.05 --llm-latency 0.5 --error-rate 0.05 --items 20
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from benchmarks.standins import Config, Upstreams
+
+# Same names the real pipeline uses, so ranking and prompts behave as in production
+RSS_SOURCES = [
+    "Truth Social", "White House", "Federal Reserve", "Department of State",
+    "Customs and Border Protection", "Commerce Department", "SEC", "DHS",
+]
+X_ACCOUNTS = [
+    ("JDVance", "X - JD Vance"), ("POTUS", "X - POTUS"), ("elonmusk", "X - Elon Musk"),
+    ("PressSec", "X - Press Secretary"), ("SecYellen", "X - Janet Yellen"),
+]
+
+
+def configure_env(workdir, upstreams):
+    """Point every module at the stand-ins and the work dir; must run before they're imported."""
+    os.environ.update({
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{upstreams.base}/v1",
+        "TWITTER_API_KEY": "bench",
+        "TWITTER_API_BASE": upstreams.base,
+        "LLM_REQUESTS_PER_MINUTE": "100000",
+        "LLM_BACKOFF_BASE": "0.05",
+        "HTTP_BACKOFF": "0.05",
+        "DELETE_TOKEN": "bench",
+        "RESET_TOKEN": "bench",
+        "POST_STORE_PATH": os.path.join(workdir, "data", "feed.db"),
+        "HTTP_CACHE_PATH": os.path.join(workdir, "cache", "http_validators.json"),
+        "LLM_CACHE_DIR": os.path.join(workdir, "cache", "llm"),
+        "TWEET_CURSORS_PATH": os.path.join(workdir, "cache", "tweet_cursors.json"),
+        "SCHEDULE_PATH": os.path.join(workdir, "cache", "source_schedule.json"),
+        "RUN_SUMMARY_PATH": os.path.join(workdir, "public", "run_summary.json"),
+        # Every refresh polls every source, as the cron job does
+        "TWEET_MIN_INTERVAL": "0",
+    })
+    os.makedirs(os.path.join(workdir, "public"), exist_ok=True)
+    os.chdir(workdir)
+
+
+def wait_for(client, job, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = client.get(job["job_url"]).get_json()
+        if state["status"] not in ("queued", "running"):
+            return state
+        time.sleep(0.05)
+    raise TimeoutError(f"job {job['job_id']} still running after {timeout}s")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Scenario:
+    def __init__(self, name, upstreams, track_memory):
+        self.name = name
+        self.upstreams = upstreams
+        self.track_memory = track_memory
+        self.feed_latencies = []
+
+    def __enter__(self):
+        self.upstreams.reset_counts()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.started
+        self.peak = tracemalloc.get_traced_memory()[1] if self.track_memory else None
+        self.counts, self.tokens = self.upstreams.snapshot()
+
+    def get_feed(self, client):
+        start = time.perf_counter()
+        response = client.get("/feed", headers={"Accept-Encoding": "br, gzip"})
+        self.feed_latencies.append(time.perf_counter() - start)
+        return response
+
+    def report(self):
+        c = self.counts
+        calls = " ".join(f"{kind}={c[kind]['calls']}" for kind in c)
+        not_modified = sum(v["not_modified"] for v in c.values())
+        errors = sum(v["errors"] for v in c.values())
+        upstream_kb = sum(v["bytes"] for v in c.values()) / 1024
+        lines = [
+            f"{self.name:>6}  {self.seconds:7.2f}s  upstream {calls} (304s {not_modified}, errors {errors}), "
+            f"{upstream_kb:,.0f} KB",
+            f"{'':>6}  tokens prompt={self.tokens['prompt']:,} completion={self.tokens['completion']:,}",
+        ]
+        if self.feed_latencies:
+            lines.append(
+                f"{'':>6}  /feed x{len(self.feed_latencies)} p50 {percentile(self.feed_latencies, 50) * 1000:.1f}ms "
+                f"p95 {percentile(self.feed_latencies, 95) * 1000:.1f}ms"
+            )
+        if self.peak is not None:
+            lines.append(f"{'':>6}  peak Python memory {self.peak / 1024 / 1024:.1f} MB")
+        return "\n".join(lines)
+
+    def as_dict(self):
+        return {
+            "seconds": round(self.seconds, 3),
+            "upstream": self.counts,
+            "tokens": self.tokens,
+            "feed_p50_ms": round(percentile(self.feed_latencies, 50) * 1000, 2),
+            "feed_p95_ms": round(percentile(self.feed_latencies, 95) * 1000, 2),
+            "peak_bytes": self.peak,
+        }
+
+
+def run(args):
+    upstreams = Upstreams(Config(
+        latency=args.latency, llm_latency=args.llm_latency, error_rate=args.error_rate,
+        items_per_feed=args.items, paragraphs=args.paragraphs, seed=args.seed,
+    )).start()
+    for source in RSS_SOURCES:
+        upstreams.add_feed(source)
+    for username, _ in X_ACCOUNTS:
+        upstreams.add_account(username)
+
+    workdir = tempfile.mkdtemp(prefix="whfeed-bench-")
+    configure_env(workdir, upstreams)
+
+    import whitehouse_feed
+    import app as app_module
+    whitehouse_feed.rss_feeds = [(upstreams.feed_url(source), source) for source in RSS_SOURCES]
+    whitehouse_feed.twitter_accounts = list(X_ACCOUNTS)
+    client = app_module.app.test_client()
+    auth = {"x-auth-token": "bench"}
+
+    if args.memory:
+        tracemalloc.start()
+    results = []
+
+    with Scenario("cold", upstreams, args.memory) as s:
+        wait_for(client, client.post("/run-feed").get_json())
+        s.get_feed(client)
+    results.append(s)
+
+    with Scenario("warm", upstreams, args.memory) as s:
+        wait_for(client, client.post("/run-feed").get_json())
+        s.get_feed(client)
+    results.append(s)
+
+    upstreams.publish(args.burst_items)
+    with Scenario("burst", upstreams, args.memory) as s:
+        stop = threading.Event()
+
+        def readers():
+            reader = app_module.app.test_client()
+            while not stop.is_set():
+                s.get_feed(reader)
+
+        threads = [threading.Thread(target=readers) for _ in range(args.readers)]
+        for t in threads:
+            t.start()
+        # Concurrent triggers coalesce onto one job
+        jobs = [client.post("/run-feed").get_json() for _ in range(args.triggers)]
+        coalesced = sum(1 for job in jobs if job["coalesced"])
+        wait_for(client, jobs[0])
+        posts = client.get("/feed").get_json()["posts"]
+        for post in posts[:args.deletes]:
+            client.post("/delete-post", json={"link": post["link"]}, headers=auth)
+        stop.set()
+        for t in threads:
+            t.join()
+    results.append(s)
+
+    upstreams.stop()
+    return results, coalesced, workdir
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--latency", type=float, default=0.02, help="seconds per feed/page/tweets response")
+    ap.add_argument("--llm-latency", type=float, default=0.3, help="seconds per chat completion")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--items", type=int, default=20, help="items per RSS feed")
+    ap.add_argument("--paragraphs", type=int, default=15, help="paragraphs per article page")
+    ap.add_argument("--burst-items", type=int, default=2, help="new items per source before the burst")
+    ap.add_argument("--readers", type=int, default=4, help="concurrent /feed clients during the burst")
+    ap.add_argument("--triggers", type=int, default=5, help="/run-feed calls fired at once in the burst")
+    ap.add_argument("--deletes", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--no-memory", dest="memory", action="store_false", help="skip tracemalloc (it slows the run)")
+    ap.add_argument("--json", help="also write the results to this file")
+    ap.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = ap.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        results, coalesced, workdir = run(args)
+
+    print(f"work dir {workdir}")
+    for s in results:
+        print(s.report())
+    print(f"burst: {coalesced}/{args.triggers} /run-feed triggers coalesced onto the running job")
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({s.name: s.as_dict() for s in results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
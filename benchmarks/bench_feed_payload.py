@@ -0,0 +1,144 @@
+"""Benchmark: feed payload and memory with raw_content inline vs split out.
+
+Builds a full feed (12 posts for each of the 13 sources) with source text
+sized like the real thing: White House feed HTML, page-fallback article text
+for agency title-only feeds, short Truth Social and X posts. It then compares
+the old document, where every post carries raw_content, with post_store's slim
+projection (content_hash only), and reports /feed body sizes (identity, gzip,
+br), the memory run_main holds for existing_posts, and the database size.
+
+    python -m benchmarks.bench_feed_payload
+    python -m benchmarks.bench_feed_payload --per-source 12 --article-chars 8000
+"""
+import argparse
+import gzip
+import json
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+from post_store import PostStore
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SOURCES = [
+    "Truth Social", "White House", "Federal Reserve", "Department of State",
+    "Customs and Border Protection", "Commerce Department", "SEC", "DHS",
+    "X - JD Vance", "X - POTUS", "X - Elon Musk", "X - Press Secretary", "X - Janet Yellen",
+]
+
+WORDS = (
+    "the president administration tariff trade agreement federal reserve rates policy security "
+    "department secretary announced today national economic border customs enforcement market "
+    "inflation growth jobs america china canada mexico steel aluminum executive order congress "
+    "senate bill funding agency commission exchange investors treasury statement"
+).split()
+
+
+def words(rng, chars):
+    out, size = [], 0
+    while size < chars:
+        word = rng.choice(WORDS)
+        out.append(word)
+        size += len(word) + 1
+    return " ".join(out)
+
+
+def raw_content(rng, source, article_chars):
+    if source == "White House":
+        return "".join(f"<p>{words(rng, article_chars // 6)}</p>" for _ in range(6))
+    if source == "Truth Social":
+        return words(rng, rng.randrange(200, 900))
+    if source.startswith("X -"):
+        return words(rng, rng.randrange(80, 280))
+    # Title-only agency feeds fall back to the article's paragraph text
+    return words(rng, rng.randrange(article_chars // 2, article_chars))
+
+
+def make_posts(per_source, article_chars, seed):
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    posts = []
+    for source in SOURCES:
+        for i in range(per_source):
+            ts = (now - timedelta(minutes=rng.randrange(0, 3 * 24 * 60))).isoformat()
+            posts.append({
+                "title": words(rng, 55),
+                "link": f"https://example.gov/{source.replace(' ', '-')}/{i}",
+                "published": ts,
+                "summary": words(rng, 200),
+                "summary_expanded": "" if source.startswith("X -") or source == "Truth Social" else words(rng, 600),
+                "tags": rng.sample(WORDS, 3),
+                "sentiment": rng.choice(["Positive", "Neutral", "Negative"]),
+                "impact": rng.randrange(1, 6),
+                "source": source,
+                "timestamp": ts,
+                "display_time": ts,
+                "raw_content": raw_content(rng, source, article_chars),
+            })
+    posts.sort(key=lambda p: p["timestamp"], reverse=True)
+    return posts
+
+
+def sizes(doc):
+    body = json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    result = {"identity": len(body), "gzip": len(gzip.compress(body, compresslevel=9))}
+    if brotli is not None:
+        result["br"] = len(brotli.compress(body, quality=11))
+    return body, result
+
+
+def held(load):
+    """Bytes still allocated by whatever `load()` returns (what run_main keeps)."""
+    tracemalloc.start()
+    value = load()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return current
+
+
+def kb(n):
+    return f"{n / 1024:,.1f} KB"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--per-source", type=int, default=12)
+    ap.add_argument("--article-chars", type=int, default=8000, help="page-fallback text cap (PAGE_TEXT_MAX_CHARS)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    posts = make_posts(args.per_source, args.article_chars, args.seed)
+    recap = {"recap": words(random.Random(args.seed), 400), "recap_time": "9:00 AM UTC"}
+    old_doc = dict(recap, posts=posts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PostStore(Path(tmp) / "feed.db")
+        store.save_feed(posts, recap["recap"], recap["recap_time"])
+        new_doc = store.projection()
+        db_size = (Path(tmp) / "feed.db").stat().st_size
+
+        old_body, old_sizes = sizes(old_doc)
+        _, new_sizes = sizes(new_doc)
+
+        old_memory = held(lambda: {p["link"]: p for p in json.loads(old_body)["posts"]})
+        new_memory = held(store.posts_by_link)
+        raw_bytes = sum(len(p["raw_content"].encode("utf-8")) for p in posts)
+
+    print(f"{len(posts)} posts ({args.per_source} per source x {len(SOURCES)} sources), {kb(raw_bytes)} of raw_content")
+    print(f"{'':>24} {'inline':>12} {'split':>12} {'reduction':>10}")
+    for encoding in old_sizes:
+        old, new = old_sizes[encoding], new_sizes[encoding]
+        print(f"{'/feed body ' + encoding:>24} {kb(old):>12} {kb(new):>12} {old / new:>9.1f}x")
+    print(f"{'existing_posts memory':>24} {kb(old_memory):>12} {kb(new_memory):>12} {old_memory / new_memory:>9.1f}x")
+    print(f"{'database file':>24} {'':>12} {kb(db_size):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark: BeautifulSoup page extraction vs page_text's streaming extractor.
+
+Times the old fetch_page_text + is_useless_content path (two BeautifulSoup
+html.parser trees) against stream_paragraphs_text plus the plain-text word
+check, on saved article pages in benchmarks/pages/*.html.
+
+    python -m benchmarks.bench_page_text --save https://www.whitehouse.gov/... https://www.state.gov/...
+    python -m benchmarks.bench_page_text
+
+With no saved pages it falls back to a synthetic agency-style page (large
+nav, inline scripts, a 15-paragraph article and a footer).
+"""
+import argparse
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+import http_client
+from page_text import stream_paragraphs_text, PAGE_TEXT_MAX_CHARS
+
+PAGES_DIR = Path(__file__).parent / "pages"
+
+
+class _SavedResponse:
+    encoding = "utf-8"
+
+    def __init__(self, body):
+        self.body = body
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+def legacy_extract(body):
+    soup = BeautifulSoup(body.decode("utf-8", errors="replace"), "html.parser")
+    paragraphs = soup.find_all("p")
+    text = " ".join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)).strip()
+    plain = BeautifulSoup(text, "html.parser").get_text(strip=True)
+    return text, len(plain.split()) < 5
+
+
+def streaming_extract(body, max_chars=None):
+    text, _ = stream_paragraphs_text(_SavedResponse(body), max_bytes=len(body) + 1, max_chars=max_chars)
+    return text, len(text.split()) < 5
+
+
+def synthetic_page():
+    nav = "".join(f'<li class="menu-item"><a href="/section/{i}">Section {i}</a></li>' for i in range(400))
+    script = "<script>window.__DATA__ = {" + ",".join(f'"k{i}": "{"x" * 80}"' for i in range(1500)) + "};</script>"
+    article = "".join(
+        f"<p>Paragraph {i}: The Department announced <a href='/x'>new measures</a> on "
+        f"<strong>trade</strong>, tariffs and supply chains, citing {i} prior actions and "
+        f"ongoing consultations with allies and industry partners.</p>"
+        for i in range(15)
+    )
+    footer = "".join(f'<div class="footer-col"><p>Footer link {i}</p></div>' for i in range(60))
+    return (
+        f"<!DOCTYPE html><html><head><title>Press Release</title>{script}</head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header><main><article>{article}</article></main>"
+        f"<footer>{footer}</footer>{script}</body></html>"
+    ).encode("utf-8")
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--save", nargs="+", metavar="URL", help="download pages into benchmarks/pages first")
+    args = ap.parse_args()
+
+    if args.save:
+        PAGES_DIR.mkdir(exist_ok=True)
+        for url in args.save:
+            res = http_client.get(url, headers={"User-Agent": "Mozilla/5.0"})
+            name = url.rstrip("/").split("://", 1)[-1].replace("/", "_")[:120] + ".html"
+            (PAGES_DIR / name).write_bytes(res.content)
+            print(f"💾 Saved {url} ({len(res.content)} bytes)")
+
+    pages = [(p.name, p.read_bytes()) for p in sorted(PAGES_DIR.glob("*.html"))] if PAGES_DIR.exists() else []
+    if not pages:
+        print("No saved pages in benchmarks/pages; using a synthetic agency page.\n")
+        pages = [("synthetic.html", synthetic_page())]
+
+    print(f"{'page':<40} {'KB':>6} {'bs4':>9} {'stream':>9} {'capped':>9} {'speedup':>8}")
+    for name, body in pages:
+        t_old, (old_text, _) = timed(legacy_extract, body)
+        t_full, (full_text, _) = timed(streaming_extract, body, len(body))
+        t_capped, _ = timed(streaming_extract, body, PAGE_TEXT_MAX_CHARS)
+        same = "" if full_text == old_text else "  (text differs)"
+        print(
+            f"{name[:40]:<40} {len(body) / 1024:>6.0f} {t_old * 1000:>7.1f}ms {t_full * 1000:>7.1f}ms "
+            f"{t_capped * 1000:>7.1f}ms {t_old / t_capped:>7.1f}x{same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark: run_main's original merge/sort/trim vs feed_ranker.FeedRanker.
+
+Builds synthetic feeds (10k+ posts across 13 sources, with refreshed links,
+timestamp ties and pinned Truth Social posts), checks both produce the same
+feed and recap selection, and prints timings.
+
+    python -m benchmarks.bench_ranker --posts 10000 50000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone, timedelta
+
+from feed_ranker import FeedRanker, select_recap_posts
+
+SOURCES = [
+    "Truth Social", "White House", "Federal Reserve", "Department of State",
+    "Customs and Border Protection", "Commerce Department", "SEC", "DHS",
+    "X - JD Vance", "X - POTUS", "X - Elon Musk", "X - Press Secretary", "X - Janet Yellen",
+]
+
+
+def legacy_rank(summarized_entries, existing_posts, now):
+    """run_main's post-processing as it was, with `now` fixed for comparison."""
+    all_posts = summarized_entries + [p for l, p in existing_posts.items() if l not in {e["link"] for e in summarized_entries}]
+
+    def sort_key(post):
+        ts = datetime.fromisoformat(post["timestamp"])
+        if post["source"] == "Truth Social" and (now - ts) < timedelta(hours=1):
+            return datetime(9999, 1, 1, tzinfo=timezone.utc)
+        return ts
+
+    all_posts.sort(key=sort_key, reverse=True)
+
+    IS_AUTO_FETCH = len(summarized_entries) > 0
+
+    if IS_AUTO_FETCH:
+        source_buckets = {}
+        for post in all_posts:
+            src = post["source"]
+            if src not in source_buckets:
+                source_buckets[src] = []
+            if len(source_buckets[src]) < 12:
+                source_buckets[src].append(post)
+
+        trimmed_posts = []
+        for bucket in source_buckets.values():
+            trimmed_posts.extend(bucket)
+    else:
+        trimmed_posts = list(all_posts)
+
+    trimmed_posts.sort(key=sort_key, reverse=True)
+
+    priority_sources = {"Truth Social", "White House"}
+    priority_posts = [p for p in trimmed_posts if p["source"] in priority_sources][:8]
+    fallback_posts = [p for p in trimmed_posts if p["source"] not in priority_sources]
+    priority_posts += fallback_posts[: (10 - len(priority_posts))]
+    return trimmed_posts, priority_posts
+
+
+def engine_rank(summarized_entries, existing_posts, now):
+    ranker = FeedRanker(existing_posts, now=now)
+    for post in summarized_entries:
+        ranker.add(post)
+    trimmed_posts = ranker.ranked()
+    return trimmed_posts, select_recap_posts(trimmed_posts)
+
+
+def make_feed(n_existing, n_new, now, seed):
+    rng = random.Random(seed)
+
+    def post(link, source):
+        # Minute resolution over a week gives plenty of exact timestamp ties
+        ts = now - timedelta(minutes=rng.randrange(0, 7 * 24 * 60))
+        return {"link": link, "source": source, "timestamp": ts.isoformat(), "title": link, "summary": ""}
+
+    existing = {}
+    for i in range(n_existing):
+        p = post(f"https://example.gov/{i}", rng.choice(SOURCES))
+        existing[p["link"]] = p
+
+    links = list(existing)
+    new = []
+    for i in range(n_new):
+        if links and rng.random() < 0.5:
+            # Refreshed post: same link and timestamp, as process_entry keeps it
+            old = existing[rng.choice(links)]
+            new.append(dict(old))
+        else:
+            new.append(post(f"https://example.gov/new/{i}", rng.choice(SOURCES)))
+    # A source with no stored posts yet
+    new.append(post("https://example.gov/fresh/0", "Department of Energy"))
+    # A few brand-new Truth Social posts inside the pin window
+    for i in range(5):
+        ts = now - timedelta(minutes=rng.randrange(0, 59))
+        new.append({"link": f"https://truth/{i}", "source": "Truth Social", "timestamp": ts.isoformat(), "title": "", "summary": ""})
+    return existing, new
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--posts", type=int, nargs="+", default=[10000, 50000])
+    ap.add_argument("--new", type=int, default=65, help="entries processed per refresh (13 sources x 5)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    now = datetime.now(timezone.utc)
+    print(f"{'posts':>8} {'mode':>10} {'legacy':>10} {'engine':>10} {'speedup':>8}")
+    for n in args.posts:
+        existing, new = make_feed(n, args.new, now, args.seed)
+        for mode, entries in (("refresh", new), ("restored", [])):
+            # The legacy version is quadratic in the new entries, so keep it to one run
+            t_legacy, expected = timed(legacy_rank, entries, existing, now, repeat=1)
+            t_engine, actual = timed(engine_rank, entries, existing, now)
+            assert [id(p) for p in actual[0]] == [id(p) for p in expected[0]], f"feed order differs ({n}, {mode})"
+            assert [id(p) for p in actual[1]] == [id(p) for p in expected[1]], f"recap selection differs ({n}, {mode})"
+            print(f"{n:>8} {mode:>10} {t_legacy * 1000:>8.1f}ms {t_engine * 1000:>8.1f}ms {t_legacy / t_engine:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
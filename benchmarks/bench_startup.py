@@ -0,0 +1,106 @@
+"""Benchmark: cold start, from process spawn to the first /feed response.
+
+Seeds a post store with a full feed, then repeatedly starts `python app.py`
+on a free port and polls /feed until it answers 200. The "eager" variant
+imports whitehouse_feed before the app, as app.py used to, so it pays for
+the ingestion and LLM stack (openai, dateutil, ...) at startup; "lazy" is
+app.py as it is now. A final "lazy, no key" run starts without
+OPENAI_API_KEY to show the read-only paths no longer need it.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_feed_payload import make_posts
+from post_store import PostStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+VARIANTS = {
+    "eager": "import whitehouse_feed, runpy; runpy.run_path('app.py', run_name='__main__')",
+    "lazy": "import runpy; runpy.run_path('app.py', run_name='__main__')",
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_feed(port, timeout):
+    """Poll /feed until it answers 200; return the body size."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/feed")
+            response = conn.getresponse()
+            body = response.read()
+            conn.close()
+            if response.status == 200:
+                return len(body)
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"/feed did not answer within {timeout}s")
+
+
+def start_once(code, env, timeout):
+    port = free_port()
+    env = dict(env, PORT=str(port))
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        size = first_feed(port, timeout)
+        return time.perf_counter() - started, size
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--per-source", type=int, default=12, help="posts per source in the seeded feed")
+    ap.add_argument("--timeout", type=float, default=60)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "feed.db"
+        PostStore(db).save_feed(make_posts(args.per_source, 8000, 1), "Recap.", "9:00 AM UTC")
+
+        env = dict(os.environ, POST_STORE_PATH=str(db), OPENAI_API_KEY="bench")
+        runs = [(name, code, env) for name, code in VARIANTS.items()]
+        no_key = {k: v for k, v in env.items() if k != "OPENAI_API_KEY"}
+        runs.append(("lazy, no key", VARIANTS["lazy"], no_key))
+
+        results = {}
+        for name, code, run_env in runs:
+            times = []
+            for _ in range(args.runs):
+                seconds, size = start_once(code, run_env, args.timeout)
+                times.append(seconds)
+            results[name] = times
+            print(f"{name:>14}  median {statistics.median(times) * 1000:7.1f}ms  "
+                  f"min {min(times) * 1000:7.1f}ms  max {max(times) * 1000:7.1f}ms  ({size / 1024:,.0f} KB /feed)")
+
+    eager, lazy = statistics.median(results["eager"]), statistics.median(results["lazy"])
+    print(f"time to first /feed: {eager * 1000:.0f}ms -> {lazy * 1000:.0f}ms ({eager / lazy:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
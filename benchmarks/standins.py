@@ -0,0 +1,259 @@
+"""Local stand-ins for every upstream run_main talks to.
+
+One threaded HTTP server plays all of them:
+
+    /rss/<source>                      RSS 2.0 feed (ETag / If-None-Match)
+    /pages/<source>/<n>                agency-style article page (ETag)
+    /twitter/user/last_tweets          twitterapi.io last-tweets shape
+    /v1/chat/completions               OpenAI chat completions shape
+
+Latency, error rate and payload sizes come from `Config`; `publish()` adds
+new items to every feed and account so a refresh has work to do. Every
+request is counted per upstream, with bytes sent and 304/error responses.
+"""
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+
+WORDS = (
+    "the president administration tariff trade agreement federal reserve rates policy security "
+    "department secretary announced today national economic border customs enforcement market "
+    "inflation growth jobs america china canada mexico steel aluminum executive order congress "
+    "senate bill funding agency commission exchange investors treasury statement"
+).split()
+
+
+class Config:
+    def __init__(self, latency=0.02, llm_latency=0.3, error_rate=0.0, items_per_feed=20, paragraphs=15,
+                 paragraph_words=60, seed=1):
+        self.latency = latency              # seconds added to every feed, page and tweets response
+        self.llm_latency = llm_latency      # seconds per chat completion
+        self.error_rate = error_rate        # share of responses that fail (429 for OpenAI, 503 otherwise)
+        self.items_per_feed = items_per_feed
+        self.paragraphs = paragraphs        # article paragraphs per page
+        self.paragraph_words = paragraph_words
+        self.seed = seed
+
+
+class Upstreams:
+    def __init__(self, config=None):
+        self.config = config or Config()
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.feeds = {}
+        self.tweets = {}
+        self.reset_counts()
+        self.server = None
+
+    # --- content ---
+
+    def _words(self, n):
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def _item(self, n, published):
+        # Agency feeds are title-only; short titles force the page fallback
+        title = self._words(3 if n % 3 == 0 else 9).capitalize()
+        return {
+            "n": n,
+            "title": title,
+            "summary": f"<p>{self._words(80)}</p><p>{self._words(60)}</p>",
+            "pubDate": formatdate(published),
+        }
+
+    def add_feed(self, source):
+        with self.lock:
+            count = self.config.items_per_feed
+            now = time.time()
+            self.feeds[source] = [self._item(n, now - 60 * (count - n)) for n in range(count)]
+
+    def add_account(self, username):
+        with self.lock:
+            self.tweets[username] = [self._tweet(username, i) for i in range(1, 6)]
+
+    def _tweet(self, username, i):
+        return {
+            "id": str(1_000_000 + i),
+            "text": f"{self._words(30)} #{i}",
+            "url": f"https://x.com/{username}/status/{1_000_000 + i}",
+            "createdAt": time.strftime("%a %b %d %H:%M:%S +0000 %Y", time.gmtime()),
+        }
+
+    def publish(self, per_source=2):
+        """New items at the top of every feed and account."""
+        with self.lock:
+            now = time.time()
+            for items in self.feeds.values():
+                top = items[-1]["n"] + 1
+                items.extend(self._item(top + i, now - (per_source - i)) for i in range(per_source))
+            for username, tweets in self.tweets.items():
+                top = int(tweets[-1]["id"]) - 1_000_000 + 1
+                tweets.extend(self._tweet(username, top + i) for i in range(per_source))
+
+    # --- bookkeeping ---
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts = {
+                kind: {"calls": 0, "not_modified": 0, "errors": 0, "bytes": 0}
+                for kind in ("rss", "pages", "tweets", "openai")
+            }
+            self.tokens = {"prompt": 0, "completion": 0}
+
+    def snapshot(self):
+        with self.lock:
+            return {kind: dict(c) for kind, c in self.counts.items()}, dict(self.tokens)
+
+    def _count(self, kind, field, n=1):
+        with self.lock:
+            self.counts[kind][field] += n
+
+    # --- URLs ---
+
+    @property
+    def base(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def feed_url(self, source):
+        return f"{self.base}/rss/{quote(source)}"
+
+    # --- responses ---
+
+    def rss(self, source):
+        with self.lock:
+            items = list(reversed(self.feeds[source][-self.config.items_per_feed:]))
+        body = "".join(
+            f"<item><title>{i['title']}</title><link>{self.base}/pages/{quote(source)}/{i['n']}</link>"
+            f"<description>{i['summary'].replace('<', '&lt;').replace('>', '&gt;')}</description>"
+            f"<pubDate>{i['pubDate']}</pubDate></item>"
+            for i in items
+        )
+        return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{source}</title>{body}</channel></rss>'.encode()
+
+    def page(self, source, n):
+        rng = random.Random(f"{source}/{n}")
+        paragraphs = "".join(
+            f"<p>{' '.join(rng.choice(WORDS) for _ in range(self.config.paragraph_words))}</p>"
+            for _ in range(self.config.paragraphs)
+        )
+        nav = "".join(f'<li><a href="/section/{k}">Section {k}</a></li>' for k in range(120))
+        script = "<script>" + "var x = 1;" * 400 + "</script>"
+        return (
+            f"<html><head><title>{source} {n}</title>{script}</head><body><nav><ul>{nav}</ul></nav>"
+            f"<main><article>{paragraphs}</article></main><footer>{nav}</footer></body></html>"
+        ).encode()
+
+    def tweets_for(self, username, limit):
+        with self.lock:
+            tweets = list(reversed(self.tweets.get(username, [])))[:limit]
+        return json.dumps({"status": "success", "data": {"tweets": tweets}}).encode()
+
+    def _analysis(self, text):
+        return {"headline": text[:50], "summary": text[:180], "tags": ["Policy"], "sentiment": "Neutral", "impact": 3}
+
+    def chat(self, body):
+        system = body["messages"][0]["content"]
+        user = body["messages"][-1]["content"]
+        if '"results"' in system:
+            # Batched analysis: one result per post id
+            content = json.dumps({"results": [
+                dict(self._analysis(post["text"]), id=post["id"]) for post in json.loads(user)["posts"]
+            ]})
+        elif "Return only this JSON" in system:
+            content = json.dumps(self._analysis(user))
+        else:
+            content = "Summary: " + " ".join(user.split()[:60])
+        prompt = (len(system) + len(user)) // 4
+        completion = len(content) // 4
+        with self.lock:
+            self.tokens["prompt"] += prompt
+            self.tokens["completion"] += completion
+        return json.dumps({
+            "id": "chatcmpl-local", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion},
+        }).encode()
+
+    # --- server ---
+
+    def start(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, kind, status, body=b"", content_type="text/plain", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                upstreams._count(kind, "bytes", len(body))
+
+            def cached(self, kind, body, content_type):
+                etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    upstreams._count(kind, "not_modified")
+                    return self.send(kind, 304, headers={"ETag": etag})
+                self.send(kind, 200, body, content_type, {"ETag": etag})
+
+            def failing(self, kind):
+                if upstreams.rng.random() < upstreams.config.error_rate:
+                    upstreams._count(kind, "errors")
+                    status = 429 if kind == "openai" else 503
+                    self.send(kind, status, b'{"error": {"message": "stand-in failure"}}', "application/json", {"Retry-After": "0"})
+                    return True
+                return False
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [unquote(p) for p in url.path.strip("/").split("/")]
+                kind = {"rss": "rss", "pages": "pages", "twitter": "tweets"}.get(parts[0])
+                if kind is None:
+                    return self.send("rss", 404)
+                upstreams._count(kind, "calls")
+                time.sleep(upstreams.config.latency)
+                if self.failing(kind):
+                    return
+                if kind == "rss":
+                    return self.cached(kind, upstreams.rss(parts[1]), "application/rss+xml")
+                if kind == "pages":
+                    return self.cached(kind, upstreams.page(parts[1], parts[2]), "text/html; charset=utf-8")
+                query = parse_qs(url.query)
+                body = upstreams.tweets_for(query["userName"][0], int(query.get("limit", ["5"])[0]))
+                self.send(kind, 200, body, "application/json")
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                upstreams._count("openai", "calls")
+                if self.failing("openai"):
+                    return
+                time.sleep(upstreams.config.llm_latency)
+                self.send("openai", 200, upstreams.chat(body), "application/json")
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                # Pooled clients drop idle keep-alive connections; that's not an error
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)
+
+        self.server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, name="standins", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
@@ -0,0 +1,101 @@
+"""The feed's daily recap, regenerated only as far as the recap posts changed.
+
+The recap is keyed on the recap posts (link, title and summary). When none
+was added, changed or dropped since the last run (even if they moved in the
+ranking) the stored recap and its recap_time are reused without a call; when only a few posts changed, the previous recap is
+patched by sending just those posts. Anything bigger, or a recap that has
+been patched RECAP_MAX_PATCHES times in a row, is written from scratch.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+from llm_queue import chat_completion
+
+RECAP_INCREMENTAL_MAX = int(os.environ.get("RECAP_INCREMENTAL_MAX", "3"))
+RECAP_MAX_PATCHES = int(os.environ.get("RECAP_MAX_PATCHES", "6"))
+RECAP_FALLBACK = "Recap temporarily unavailable due to processing error."
+
+stats = {"reused": 0, "patched": 0, "full": 0}
+
+
+def post_digest(post):
+    raw = json.dumps([post.get("title", ""), post.get("summary", "")], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _line(post):
+    return f"- {post['title']}: {post['summary']}"
+
+
+def _full(posts):
+    text = "\n".join(_line(p) for p in posts)
+    return chat_completion(
+        "You are a professional news summarizer. Recap the day's news in 2–4 insightful sentences.",
+        f"Summarize the following:\n{text}",
+        temperature=0.4,
+    )
+
+
+def _patch(recap, added, removed):
+    parts = [f"Current recap:\n{recap}"]
+    if removed:
+        parts.append("No longer in the news:\n" + "\n".join(f"- {title}" for title in removed))
+    if added:
+        parts.append("New or updated:\n" + "\n".join(_line(p) for p in added))
+    return chat_completion(
+        "You are a professional news summarizer. Update the recap of the day's news to reflect the changes, "
+        "dropping stories that are no longer in the news. Reply with the new recap only, in 2–4 insightful sentences.",
+        "\n\n".join(parts),
+        temperature=0.4,
+    )
+
+
+def build_recap(posts, previous=None):
+    """Return (recap, recap_time, state) for the ordered recap `posts`.
+
+    `previous` is the state returned by the last run (None on first use);
+    store the returned state for the next one.
+    """
+    previous = previous or {}
+    items = [[p["link"], post_digest(p), p.get("title", "")] for p in posts]
+    old_items = previous.get("items") or []
+    old_recap = previous.get("recap")
+
+    old = {link: digest for link, digest, _ in old_items}
+    new = {link: digest for link, digest, _ in items}
+    added = [p for p, (link, digest, _) in zip(posts, items) if old.get(link) != digest]
+    removed = [title for link, _, title in old_items if link not in new]
+    patches = previous.get("patches", 0)
+
+    if old_recap and not added and not removed:
+        # Same posts, at most reordered: nothing for the recap to say
+        stats["reused"] += 1
+        return old_recap, previous.get("recap_time"), dict(previous, items=items)
+
+    try:
+        if old_recap and len(added) + len(removed) <= RECAP_INCREMENTAL_MAX and patches < RECAP_MAX_PATCHES:
+            print(f"🩹 Updating recap for {len(added)} new and {len(removed)} dropped posts")
+            recap = _patch(old_recap, added, removed)
+            patches += 1
+            stats["patched"] += 1
+        else:
+            recap = _full(posts)
+            patches = 0
+            stats["full"] += 1
+    except Exception as e:
+        print(f"❌ Recap generation failed: {e}")
+        # Keep the last good recap; its state is unchanged so the next run retries
+        if old_recap:
+            return old_recap, previous.get("recap_time"), previous
+        return RECAP_FALLBACK, datetime.now(timezone.utc).strftime("%I:%M %p UTC").lstrip("0"), previous
+
+    recap_time = datetime.now(timezone.utc).strftime("%I:%M %p UTC").lstrip("0")
+    state = {"items": items, "recap": recap, "recap_time": recap_time, "patches": patches}
+    return recap, recap_time, state
+
+
+def reset_stats():
+    for name in stats:
+        stats[name] = 0
@@ -0,0 +1,103 @@
+"""Near-duplicate detection for posts across sources.
+
+Each post's text is normalized (tags, URLs and punctuation stripped,
+lowercased), split into overlapping word pairs and summarized by a MinHash
+signature. Two posts are near-duplicates when their estimated Jaccard
+similarity is at least DEDUP_THRESHOLD. The index buckets signatures by
+LSH bands, so a lookup only compares against posts sharing a band rather
+than the whole history. With 16 bands of 4 rows, pairs above ~0.5
+similarity are almost always found; DEDUP_THRESHOLD then filters them.
+
+Signatures are packed into 8-byte words for storage (`pack`/`unpack`) so the
+post store can keep one next to each text instead of recomputing it.
+"""
+import hashlib
+import os
+import random
+import re
+import struct
+
+from page_text import html_to_text
+
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.7"))
+DEDUP_MIN_WORDS = int(os.environ.get("DEDUP_MIN_WORDS", "8"))
+SHINGLE_SIZE = 2
+BANDS = 16
+ROWS = 4
+NUM_PERM = BANDS * ROWS
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1601)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_URL_RE = re.compile(r"https?://\S+")
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize(text):
+    if "<" in text or "&" in text:
+        text = html_to_text(text)
+    text = _URL_RE.sub(" ", text.lower())
+    return _NON_WORD_RE.sub(" ", text).split()
+
+
+def signature(text):
+    """MinHash signature of `text`, or None when it's too short to compare reliably."""
+    words = normalize(text or "")
+    if len(words) < DEDUP_MIN_WORDS:
+        return None
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def pack(sig):
+    # Empty bytes for "too short to have a signature"
+    return b"" if sig is None else struct.pack(f"<{len(sig)}Q", *sig)
+
+
+def unpack(blob):
+    if not blob or len(blob) != NUM_PERM * 8:
+        return None
+    return struct.unpack(f"<{NUM_PERM}Q", blob)
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class SimilarityIndex:
+    def __init__(self, threshold=None):
+        self.threshold = DEDUP_THRESHOLD if threshold is None else threshold
+        self.buckets = {}
+        self.items = {}
+
+    def _bands(self, sig):
+        return [(i, sig[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+    def add(self, key, sig, group=None):
+        """Index `key`; entries with the same `group` never match each other."""
+        if sig is None:
+            return
+        self.items[key] = (sig, group)
+        for band in self._bands(sig):
+            self.buckets.setdefault(band, []).append(key)
+
+    def find(self, sig, group=None):
+        """The most similar indexed key at or above the threshold, or None."""
+        if sig is None:
+            return None
+        best, best_score = None, self.threshold
+        seen = set()
+        for band in self._bands(sig):
+            for key in self.buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                other, other_group = self.items[key]
+                if group is not None and other_group == group:
+                    continue
+                score = similarity(sig, other)
+                if score >= best_score:
+                    best, best_score = key, score
+        return best
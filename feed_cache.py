@@ -0,0 +1,65 @@
+"""In-memory, precompressed copy of the public feed.
+
+The feed is serialized once (compact JSON) and compressed with gzip and, when
+the `brotli` package is installed, brotli. Bodies are rebuilt only when the
+post store's version changes, so serving /feed is one indexed lookup plus a
+dict access.
+"""
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class FeedCache:
+    def __init__(self, store):
+        self.store = store
+        self.version = None
+        self.bodies = {}
+        self.digest = None
+        self.lock = threading.Lock()
+
+    def _build(self, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            bodies["br"] = brotli.compress(body, quality=11)
+        self.bodies = bodies
+        self.digest = hashlib.sha1(body).hexdigest()[:20]
+
+    def current(self):
+        """Return (bodies, digest), rebuilding if the store changed."""
+        version = self.store.version()
+        with self.lock:
+            if version != self.version:
+                self._build(self.store.projection())
+                self.version = version
+            return self.bodies, self.digest
+
+    def invalidate(self):
+        with self.lock:
+            self.version = None
+
+
+def choose_encoding(accept_encoding, available):
+    """Pick br, then gzip, from an Accept-Encoding header; fall back to identity."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
@@ -0,0 +1,107 @@
+"""In-process log of feed changes for delta and push consumers.
+
+run_main publishes an event for every post it adds, updates or drops, and
+/delete-post (and the other admin routes) publish removals. Events carry an
+id "<epoch>-<seq>": the epoch is fixed for the life of the process, the
+sequence increases by one per event. A consumer passes back the last id it
+saw; `since` returns what happened after it, or asks for a full resync when
+that cursor is from another process or has already aged out of the log.
+"""
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+FEED_EVENTS_CAPACITY = int(os.environ.get("FEED_EVENTS_CAPACITY", "2000"))
+
+
+def _summary(post):
+    # Drop the scraped source text; consumers only need what /feed serves
+    return {k: v for k, v in post.items() if k != "raw_content"}
+
+
+class EventLog:
+    def __init__(self, capacity=FEED_EVENTS_CAPACITY):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.events = deque(maxlen=capacity)
+        self.cond = threading.Condition()
+
+    def _append(self, kind, link=None, post=None):
+        self.seq += 1
+        event = {
+            "id": f"{self.epoch}-{self.seq}",
+            "type": kind,
+            "at": datetime.now(timezone.utc).isoformat(),
+        }
+        if link is not None:
+            event["link"] = link
+        if post is not None:
+            event["post"] = _summary(post)
+        self.events.append((self.seq, event))
+
+    def publish_changes(self, added=(), updated=(), removed=()):
+        """Record posts added/updated (dicts) and removed (links) as one batch."""
+        if not (added or updated or removed):
+            return
+        with self.cond:
+            for post in added:
+                self._append("added", post["link"], post)
+            for post in updated:
+                self._append("updated", post["link"], post)
+            for link in removed:
+                self._append("removed", link)
+            self.cond.notify_all()
+
+    def publish_reset(self):
+        """The whole feed was replaced; consumers should reload /feed."""
+        with self.cond:
+            self._append("reset")
+            self.cond.notify_all()
+
+    def cursor(self):
+        with self.cond:
+            return f"{self.epoch}-{self.seq}"
+
+    def _parse(self, cursor):
+        try:
+            epoch, seq = cursor.rsplit("-", 1)
+            seq = int(seq)
+        except (AttributeError, ValueError):
+            return None
+        if epoch != self.epoch or seq > self.seq:
+            return None
+        oldest = self.events[0][0] if self.events else self.seq + 1
+        # Events after `seq` must all still be in the log
+        if seq + 1 < oldest:
+            return None
+        return seq
+
+    def since(self, cursor, limit=None):
+        """Return (events, next_cursor, resync).
+
+        `resync` is True when `cursor` can't be served from the log (missing,
+        from before a restart, or too old); the caller should start from a
+        full snapshot and continue from `next_cursor`.
+        """
+        with self.cond:
+            seq = self._parse(cursor) if cursor else None
+            if seq is None:
+                return [], f"{self.epoch}-{self.seq}", True
+            events = [event for s, event in self.events if s > seq]
+            if limit is not None and len(events) > limit:
+                events = events[:limit]
+                return events, events[-1]["id"], False
+            return events, f"{self.epoch}-{self.seq}", False
+
+    def wait(self, cursor, timeout):
+        """Block until there are events after `cursor` (or `timeout` seconds pass)."""
+        with self.cond:
+            seq = self._parse(cursor)
+            if seq is None:
+                return
+            self.cond.wait_for(lambda: self.seq > seq, timeout=timeout)
+
+
+feed_events = EventLog()
@@ -0,0 +1,158 @@
+"""Incremental merge, rank and trim for run_main.
+
+Reproduces run_main's original post-processing exactly:
+
+    all_posts = new_entries + [existing posts whose link wasn't refreshed]
+    all_posts.sort(key=sort_key, reverse=True)
+    keep the first 12 per source (only when there are new entries)
+    re-sort, then pick 8 priority-source posts + 2 others for the recap
+
+but keeps a bounded heap of the top posts per source, updated as entries
+arrive, and parses each timestamp once. Ties are broken the way Python's
+stable sort broke them: by position in `all_posts`, then (after trimming)
+by the order sources first appeared.
+"""
+import heapq
+from datetime import datetime, timezone, timedelta
+
+PER_SOURCE_LIMIT = 12
+PIN_SOURCE = "Truth Social"
+PIN_WINDOW = timedelta(hours=1)
+PRIORITY_SOURCES = {"Truth Social", "White House"}
+PRIORITY_LIMIT = 8
+RECAP_SIZE = 10
+
+# Existing posts sit after every new entry in the original all_posts list
+_EXISTING_OFFSET = 1 << 40
+
+
+def sort_key(post, now=None):
+    """The feed's ordering key: newest first, recent Truth Social posts pinned on top."""
+    ts = datetime.fromisoformat(post["timestamp"])
+    now = now or datetime.now(timezone.utc)
+    if post["source"] == PIN_SOURCE and (now - ts) < PIN_WINDOW:
+        return datetime(9999, 1, 1, tzinfo=timezone.utc)
+    return ts
+
+
+class _Bucket:
+    __slots__ = ("heap", "members", "dirty")
+
+    def __init__(self):
+        # Min-heap of (key, -order, id): the root is the worst post kept
+        self.heap = []
+        self.members = set()
+        self.dirty = False
+
+
+class FeedRanker:
+    def __init__(self, existing_posts=None, per_source=PER_SOURCE_LIMIT, now=None):
+        self.per_source = per_source
+        self.now = now or datetime.now(timezone.utc)
+        self.pin_cutoff = (self.now - PIN_WINDOW).timestamp()
+        # Post ids index into these parallel lists
+        self.posts = []
+        self.keys = []
+        self.by_source = {}
+        self.buckets = {}
+        self.existing_ids = {}
+        self.superseded = set()
+        self.new_count = 0
+
+        posts, keys, by_source = self.posts, self.keys, self.by_source
+        fromiso, cutoff, inf = datetime.fromisoformat, self.pin_cutoff, float("inf")
+        for i, post in enumerate((existing_posts or {}).values()):
+            pid = len(posts)
+            source = post["source"]
+            ts = fromiso(post["timestamp"]).timestamp()
+            posts.append(post)
+            keys.append((inf if source == PIN_SOURCE and ts > cutoff else ts, -(_EXISTING_OFFSET + i)))
+            if source in by_source:
+                by_source[source].append(pid)
+            else:
+                by_source[source] = [pid]
+            self.existing_ids[post["link"]] = pid
+        for source in by_source:
+            self._rebuild(source)
+
+    def _key(self, post):
+        ts = datetime.fromisoformat(post["timestamp"]).timestamp()
+        if post["source"] == PIN_SOURCE and ts > self.pin_cutoff:
+            return float("inf")
+        return ts
+
+    def _register(self, post, order):
+        pid = len(self.posts)
+        self.posts.append(post)
+        self.keys.append((self._key(post), -order))
+        self.by_source.setdefault(post["source"], []).append(pid)
+        return pid
+
+    def _rebuild(self, source):
+        bucket = self.buckets.setdefault(source, _Bucket())
+        pids = self.by_source[source]
+        if self.superseded:
+            pids = [pid for pid in pids if pid not in self.superseded]
+        top = heapq.nlargest(self.per_source, pids, key=self.keys.__getitem__)
+        bucket.heap = [(self.keys[pid], pid) for pid in top]
+        heapq.heapify(bucket.heap)
+        bucket.members = set(top)
+        bucket.dirty = False
+
+    def add(self, post):
+        """Add a freshly processed (new or reused) entry."""
+        pid = self._register(post, self.new_count)
+        self.new_count += 1
+
+        # A refreshed link replaces the stored copy of that post
+        old = self.existing_ids.pop(post["link"], None)
+        if old is not None:
+            self.superseded.add(old)
+            old_bucket = self.buckets.get(self.posts[old]["source"])
+            if old_bucket and old in old_bucket.members:
+                old_bucket.dirty = True
+
+        bucket = self.buckets.setdefault(post["source"], _Bucket())
+        if bucket.dirty:
+            return
+        item = (self.keys[pid], pid)
+        if len(bucket.heap) < self.per_source:
+            heapq.heappush(bucket.heap, item)
+            bucket.members.add(pid)
+        elif item[0] > bucket.heap[0][0]:
+            _, dropped = heapq.heapreplace(bucket.heap, item)
+            bucket.members.discard(dropped)
+            bucket.members.add(pid)
+
+    @property
+    def has_new(self):
+        return self.new_count > 0
+
+    def ranked(self, trim=None):
+        """The final feed order. Trims to the per-source limit when there were new entries."""
+        trim = self.has_new if trim is None else trim
+        if not trim:
+            live = sorted(range(len(self.posts)), key=self.keys.__getitem__, reverse=True)
+            return [self.posts[pid] for pid in live if pid not in self.superseded]
+
+        for source, bucket in self.buckets.items():
+            if bucket.dirty:
+                self._rebuild(source)
+
+        # Buckets are concatenated in the order their best post appeared
+        buckets = [sorted(b.members, key=self.keys.__getitem__, reverse=True) for b in self.buckets.values() if b.members]
+        buckets.sort(key=lambda pids: self.keys[pids[0]], reverse=True)
+        ordered = [
+            (self.keys[pid][0], -rank, self.keys[pid][1], pid)
+            for rank, pids in enumerate(buckets)
+            for pid in pids
+        ]
+        ordered.sort(reverse=True)
+        return [self.posts[pid] for *_, pid in ordered]
+
+
+def select_recap_posts(trimmed_posts):
+    """Up to 8 priority-source posts, topped up to 10 with the rest."""
+    priority_posts = [p for p in trimmed_posts if p["source"] in PRIORITY_SOURCES][:PRIORITY_LIMIT]
+    fallback_posts = [p for p in trimmed_posts if p["source"] not in PRIORITY_SOURCES]
+    return priority_posts + fallback_posts[: (RECAP_SIZE - len(priority_posts))]
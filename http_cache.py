@@ -0,0 +1,111 @@
+"""Per-URL HTTP validators for conditional GETs.
+
+Remembers the ETag / Last-Modified of each feed and article page (and, for
+pages, the text extracted from it) in HTTP_CACHE_PATH so the next refresh can
+send If-None-Match / If-Modified-Since and skip work on a 304. Pages unused
+for HTTP_CACHE_PAGE_MAX_AGE_DAYS are dropped on save, and beyond
+HTTP_CACHE_MAX_PAGES the least recently used go first.
+"""
+import os
+import time
+from pathlib import Path
+
+import metrics
+from json_state import JsonState
+
+HTTP_CACHE_PATH = Path(os.environ.get("HTTP_CACHE_PATH", "cache/http_validators.json"))
+HTTP_CACHE_PAGE_MAX_AGE_DAYS = float(os.environ.get("HTTP_CACHE_PAGE_MAX_AGE_DAYS", "14"))
+HTTP_CACHE_MAX_PAGES = int(os.environ.get("HTTP_CACHE_MAX_PAGES", "2000"))
+
+_state = JsonState(
+    HTTP_CACHE_PATH, "HTTP validators",
+    ("requests", "not_modified", "bytes_fetched", "bytes_saved", "parses_skipped"), ensure_ascii=False,
+)
+stats = _state.stats
+_lock = _state.lock
+_load = _state.data
+reset_stats = _state.reset_stats
+
+
+def conditional_headers(url):
+    with _lock:
+        entry = _load().get(url)
+    if not entry:
+        return {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def remember(url, response, size=None, keep=False, **extra):
+    """Record the validators from a 200 response, plus any extra fields.
+
+    Pass `size` for streamed responses whose body wasn't fully read, and
+    `keep=True` to store `extra` even when the response has no validators.
+    """
+    size = len(response.content) if size is None else size
+    metrics.inc("http_bytes_fetched_total", size)
+    with _lock:
+        stats["requests"] += 1
+        stats["bytes_fetched"] += size
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified and not keep:
+            _load().pop(url, None)
+            return
+        _load()[url] = {"etag": etag, "last_modified": last_modified, "length": size, "used": time.time(), **extra}
+
+
+def stored(url, field, default=None):
+    """An extra field saved with `url`'s validators."""
+    with _lock:
+        return _load().get(url, {}).get(field, default)
+
+
+def not_modified(url):
+    """Count a 304 for `url` and return what was stored with its validators."""
+    with _lock:
+        entry = _load().get(url, {})
+        if entry:
+            entry["used"] = time.time()
+        stats["requests"] += 1
+        stats["not_modified"] += 1
+        stats["bytes_saved"] += entry.get("length", 0)
+        stats["parses_skipped"] += 1
+    metrics.inc("http_not_modified_total")
+    metrics.inc("http_bytes_saved_total", entry.get("length", 0))
+    return entry
+
+
+def forget(url):
+    with _lock:
+        _load().pop(url, None)
+
+
+def _prune(validators, now):
+    # Only pages carry text and grow without bound; feed entries stay
+    pages = []
+    for url, entry in validators.items():
+        if "text" in entry:
+            # Entries saved before "used" existed start their clock now
+            pages.append((entry.setdefault("used", now), url))
+    pages.sort()
+    cutoff = now - HTTP_CACHE_PAGE_MAX_AGE_DAYS * 86400
+    live = [url for used, url in pages if used >= cutoff]
+    drop = [url for used, url in pages if used < cutoff] + live[:max(0, len(live) - HTTP_CACHE_MAX_PAGES)]
+    for url in drop:
+        del validators[url]
+    return len(drop)
+
+
+def _evict(validators):
+    evicted = _prune(validators, time.time())
+    if evicted:
+        metrics.inc("http_cache_pages_evicted_total", evicted)
+
+
+def save():
+    _state.save(before=_evict)
@@ -0,0 +1,107 @@
+"""Shared HTTP client for every outbound fetch.
+
+One `requests.Session` keeps a keep-alive pool per host, so repeat requests to
+the same agency site reuse their TCP+TLS connection. GETs are retried with
+backoff on connection errors and 429/5xx responses (a Retry-After wait is
+capped at HTTP_RETRY_AFTER_MAX seconds, so a throttled host can't stall a
+deadline-bound fetch), every call gets a connect and read timeout, and bodies larger than HTTP_MAX_BYTES are refused.
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "15"))
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))
+HTTP_RETRY_AFTER_MAX = float(os.environ.get("HTTP_RETRY_AFTER_MAX", "5"))
+HTTP_POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "20"))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "8"))
+HTTP_MAX_BYTES = int(os.environ.get("HTTP_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+
+class _CappedRetry(Retry):
+    """Retry that never sleeps longer than HTTP_RETRY_AFTER_MAX for a Retry-After header."""
+
+    def parse_retry_after(self, retry_after):
+        return min(super().parse_retry_after(retry_after), HTTP_RETRY_AFTER_MAX)
+
+
+def _build_session():
+    retry = _CappedRetry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
+
+
+session = _build_session()
+
+
+def _read_capped(response, max_bytes):
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        response.close()
+        raise ResponseTooLarge(f"{response.url} is {length} bytes (cap {max_bytes})")
+
+    chunks = []
+    size = 0
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        size += len(chunk)
+        if size > max_bytes:
+            response.close()
+            raise ResponseTooLarge(f"{response.url} exceeded {max_bytes} bytes")
+        chunks.append(chunk)
+
+    # Hand back a normal, fully-read response so .content/.text/.json() work
+    response._content = b"".join(chunks)
+    response._content_consumed = True
+
+
+def get(url, headers=None, timeout=None, max_bytes=None, **kwargs):
+    """GET `url` through the shared session.
+
+    `timeout` is the read timeout in seconds (connect timeout is always
+    HTTP_CONNECT_TIMEOUT); `max_bytes` overrides HTTP_MAX_BYTES.
+    """
+    response = session.get(
+        url,
+        headers=headers,
+        timeout=(HTTP_CONNECT_TIMEOUT, timeout or HTTP_READ_TIMEOUT),
+        stream=True,
+        **kwargs
+    )
+    _read_capped(response, max_bytes or HTTP_MAX_BYTES)
+    return response
+
+
+def stream(url, headers=None, timeout=None, **kwargs):
+    """GET `url` without reading the body.
+
+    The caller reads it incrementally (e.g. `iter_content`) and must close
+    the response; enforcing a size cap is up to the caller.
+    """
+    return session.get(
+        url,
+        headers=headers,
+        timeout=(HTTP_CONNECT_TIMEOUT, timeout or HTTP_READ_TIMEOUT),
+        stream=True,
+        **kwargs
+    )
@@ -0,0 +1,124 @@
+"""Background refresh jobs for the Flask app.
+
+A refresh runs on its own thread and reports its stage and progress through
+a callback. Only one refresh runs at a time: triggering while one is in
+flight returns the running job instead of starting another, as long as that
+job does this one's work (JOINS); otherwise the trigger raises JobConflict.
+A due-only refresh can join any job, a full refresh joins another full
+refresh or a reset (both poll every source), and a reset only joins a reset.
+"""
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# The running job kinds a trigger of each kind may join; unknown kinds join only their own
+JOINS = {
+    "due": {"due", "refresh", "reset"},
+    "refresh": {"refresh", "reset"},
+    "reset": {"reset"},
+}
+
+
+class JobConflict(Exception):
+    def __init__(self, job):
+        super().__init__(f"A {job['kind']} job is already running")
+        self.job = job
+
+
+class RefreshJobs:
+    def __init__(self, history=50):
+        self.history = history
+        self.jobs = {}
+        self.order = []
+        self.current = None
+        self.lock = threading.Lock()
+
+    def trigger(self, target, kind="refresh"):
+        """Start `target(progress)` in the background unless a job is running.
+
+        Returns (job, coalesced) where `coalesced` is True when the caller
+        was attached to the job already in flight. Raises JobConflict when
+        the job in flight is of another kind and wouldn't do this one's work.
+        """
+        with self.lock:
+            if self.current and self.current["status"] in ("queued", "running"):
+                if self.current["kind"] not in JOINS.get(kind, {kind}):
+                    raise JobConflict(self._snapshot(self.current))
+                self.current["coalesced_triggers"] += 1
+                return self._snapshot(self.current), True
+
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "kind": kind,
+                "status": "queued",
+                "stage": "queued",
+                "progress": {},
+                "timings": {},
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+                "coalesced_triggers": 0,
+            }
+            self.jobs[job["id"]] = job
+            self.order.append(job["id"])
+            while len(self.order) > self.history:
+                self.jobs.pop(self.order.pop(0), None)
+            self.current = job
+
+        threading.Thread(target=self._run, args=(job, target), name=f"job-{job['id']}", daemon=True).start()
+        return self._snapshot(job), False
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def _snapshot(self, job):
+        snap = dict(job, progress=dict(job["progress"]), timings=dict(job["timings"]))
+        snap.pop("_stage_started", None)
+        return snap
+
+    def _run(self, job, target):
+        started = time.monotonic()
+        with self.lock:
+            job["status"] = "running"
+            job["started_at"] = _now()
+
+        def progress(stage, done=None, total=None):
+            now = time.monotonic()
+            with self.lock:
+                if stage != job["stage"]:
+                    if "_stage_started" in job:
+                        job["timings"][job["stage"]] = round(now - job["_stage_started"], 3)
+                    job["stage"] = stage
+                    job["_stage_started"] = now
+                    job["progress"] = {}
+                if done is not None:
+                    job["progress"]["done"] = done
+                if total is not None:
+                    job["progress"]["total"] = total
+
+        try:
+            target(progress)
+            status, error = "succeeded", None
+        except Exception as e:
+            traceback.print_exc()
+            status, error = "failed", str(e)
+
+        progress("finished")
+        with self.lock:
+            job["status"] = status
+            job["error"] = error
+            job["finished_at"] = _now()
+            job["timings"]["total"] = round(time.monotonic() - started, 3)
+
+
+refresh_jobs = RefreshJobs()
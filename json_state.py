@@ -0,0 +1,54 @@
+"""A JSON dict persisted to disk, shared by the small caches between refreshes.
+
+Loaded lazily on first use, saved atomically (.tmp + os.replace) and guarded
+by one lock, with a dict of counters that each run resets.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class JsonState:
+    def __init__(self, path, label, stats=(), ensure_ascii=True):
+        self.path = Path(path)
+        self.label = label
+        self.stats = dict.fromkeys(stats, 0)
+        self.ensure_ascii = ensure_ascii
+        self.lock = threading.Lock()
+        self._data = None
+
+    def data(self):
+        """The loaded dict ({} when the file is missing or unreadable); call with `lock` held."""
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.stats[name] += n
+
+    def save(self, before=None):
+        """Write the dict out if it was ever loaded; `before(data)` runs first, under the lock."""
+        with self.lock:
+            if self._data is None:
+                return
+            if before:
+                before(self._data)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self._data, f, ensure_ascii=self.ensure_ascii)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"⚠️ Could not save {self.label}: {e}")
+
+    def reset_stats(self):
+        with self.lock:
+            for name in self.stats:
+                self.stats[name] = 0
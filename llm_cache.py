@@ -0,0 +1,150 @@
+"""On-disk, content-addressed cache of OpenAI chat completions.
+
+Entries are keyed by a hash of model, system prompt, temperature and user
+content, stored one JSON file per key under LLM_CACHE_DIR, and survive
+restarts. Entries older than LLM_CACHE_MAX_AGE_DAYS are dropped on read, and
+`prune` trims the least recently used entries once the directory grows past
+LLM_CACHE_MAX_BYTES. Pruning reads every entry, so it runs at most once per
+LLM_CACHE_PRUNE_INTERVAL_HOURS.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+LLM_CACHE_DIR = Path(os.environ.get("LLM_CACHE_DIR", "cache/llm"))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+LLM_CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30"))
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") != "0"
+LLM_CACHE_PRUNE_INTERVAL_HOURS = float(os.environ.get("LLM_CACHE_PRUNE_INTERVAL_HOURS", "24"))
+
+stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_lock = threading.Lock()
+
+
+def _count(name, n=1):
+    with _lock:
+        stats[name] += n
+
+
+def _expired(created, now, max_age=None):
+    # Age counts from when the reply was cached, not when it was last used
+    return now - created > (LLM_CACHE_MAX_AGE_DAYS * 86400 if max_age is None else max_age)
+
+
+def make_key(model, system_prompt, temperature, user_content):
+    payload = json.dumps([model, system_prompt, temperature, user_content], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _path(key):
+    return LLM_CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key):
+    if not LLM_CACHE_ENABLED:
+        return None
+    path = _path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        _count("misses")
+        return None
+
+    if _expired(entry.get("created", 0), time.time()):
+        discard(key)
+        _count("evictions")
+        _count("misses")
+        return None
+
+    try:
+        # mtime doubles as last-used time for LRU pruning
+        os.utime(path)
+    except OSError:
+        pass
+    _count("hits")
+    return entry["content"]
+
+
+def put(key, content):
+    if not LLM_CACHE_ENABLED:
+        return
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "content": content}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        _count("writes")
+    except OSError as e:
+        print(f"⚠️ Could not write LLM cache entry: {e}")
+
+
+def discard(key):
+    try:
+        _path(key).unlink()
+    except OSError:
+        pass
+
+
+def reset_stats():
+    with _lock:
+        for name in stats:
+            stats[name] = 0
+
+
+def prune(max_bytes=None, max_age_days=None, force=False):
+    """Drop expired entries, then least recently used ones until under the size cap.
+
+    Skipped (returning 0) if the last prune was within
+    LLM_CACHE_PRUNE_INTERVAL_HOURS, unless `force`.
+    """
+    max_bytes = LLM_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    max_age = (LLM_CACHE_MAX_AGE_DAYS if max_age_days is None else max_age_days) * 86400
+    if not LLM_CACHE_DIR.exists():
+        return 0
+
+    now = time.time()
+    stamp = LLM_CACHE_DIR / ".last_prune"
+    try:
+        if not force and now - stamp.stat().st_mtime < LLM_CACHE_PRUNE_INTERVAL_HOURS * 3600:
+            return 0
+    except OSError:
+        pass
+    files = []
+    for path in LLM_CACHE_DIR.glob("*/*.json"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                created = json.load(f).get("created", 0)
+        except (OSError, ValueError):
+            # Unreadable entries count as expired
+            created = 0
+        files.append((st.st_mtime, st.st_size, created, path))
+
+    removed = 0
+    total = sum(size for _, size, _, _ in files)
+    files.sort()
+    for mtime, size, created, path in files:
+        if not _expired(created, now, max_age) and total <= max_bytes:
+            continue
+        try:
+            path.unlink()
+            removed += 1
+            total -= size
+        except OSError:
+            pass
+
+    try:
+        stamp.touch()
+    except OSError:
+        pass
+    _count("evictions", removed)
+    return removed
@@ -0,0 +1,160 @@
+"""Bounded-parallel OpenAI calls with client-side rate limiting.
+
+Every chat completion goes through `chat_completion`, which waits on a shared
+token bucket and retries 429s with jittered exponential backoff. Responses
+are served from and written to `llm_cache` first, so unchanged inputs never
+reach the API twice.
+`SummarizationQueue` runs those calls on a small thread pool and hands the
+results back in the order posts were submitted.
+
+The OpenAI client honours OPENAI_BASE_URL, so the whole pipeline can be
+pointed at a local fake chat-completions server.
+"""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+import llm_cache
+import metrics
+from rate_limit import TokenBucket
+
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-3.5-turbo")
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "30"))
+
+# Retries are handled here so they share the rate limiter
+openai.max_retries = 0
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE / 60.0, capacity=LLM_MAX_IN_FLIGHT)
+
+
+def _backoff_delay(attempt, error):
+    # Full jitter, but never sooner than the server's Retry-After
+    delay = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            delay = max(delay, float(response.headers.get("retry-after", 0)))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+
+def cached_completion(system_prompt, user_content, temperature, model=None, parse=None):
+    """What chat_completion would return from the cache, or None if it would call the API."""
+    key = llm_cache.make_key(model or LLM_MODEL, system_prompt, temperature, user_content)
+    cached = llm_cache.get(key)
+    if cached is None:
+        return None
+    try:
+        result = parse(cached) if parse else cached
+    except Exception:
+        llm_cache.discard(key)
+        return None
+    metrics.inc("llm_calls_total", outcome="cached")
+    return result
+
+
+def remember_completion(system_prompt, user_content, temperature, content, model=None):
+    """Cache `content` as the reply to this request, e.g. one item of a batched reply."""
+    llm_cache.put(llm_cache.make_key(model or LLM_MODEL, system_prompt, temperature, user_content), content)
+
+
+def chat_completion(system_prompt, user_content, temperature, model=None, parse=None, response_format=None):
+    """Return the reply text, or `parse(reply)` when a parser is given.
+
+    Replies are only cached once they parse, so a malformed answer is retried
+    on the next run rather than replayed forever. `response_format` is passed
+    through to the API (e.g. {"type": "json_object"}).
+    """
+    model = model or LLM_MODEL
+    cached = cached_completion(system_prompt, user_content, temperature, model, parse)
+    if cached is not None:
+        return cached
+    key = llm_cache.make_key(model, system_prompt, temperature, user_content)
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
+    ]
+    options = {"response_format": response_format} if response_format else {}
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        _bucket.acquire()
+        try:
+            with metrics.span("llm_request_seconds", model=model):
+                response = openai.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    **options
+                )
+            content = response.choices[0].message.content.strip()
+        except RETRYABLE_ERRORS as e:
+            metrics.inc("llm_calls_total", outcome=type(e).__name__)
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = _backoff_delay(attempt, e)
+            print(f"⏳ OpenAI {type(e).__name__}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        metrics.inc("llm_calls_total", outcome="ok")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.inc("llm_tokens_total", usage.prompt_tokens or 0, model=model, kind="prompt")
+            metrics.inc("llm_tokens_total", usage.completion_tokens or 0, model=model, kind="completion")
+        result = parse(content) if parse else content
+        llm_cache.put(key, content)
+        return result
+
+
+class SummarizationQueue:
+    """Runs LLM jobs concurrently under an in-flight limit.
+
+    Each `submit` takes an item plus one or more zero-argument callables;
+    `submit_batch` takes several items and one callable returning a result
+    per item. `results` yields (item, [call results]) in submission order.
+    """
+
+    def __init__(self, max_in_flight=None):
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_in_flight or LLM_MAX_IN_FLIGHT,
+            thread_name_prefix="llm"
+        )
+        self.jobs = []
+
+    def submit(self, item, *calls):
+        self.jobs.append((item, [self.pool.submit(call) for call in calls]))
+
+    def submit_batch(self, items, call):
+        future = self.pool.submit(call)
+        for i, item in enumerate(items):
+            self.jobs.append((item, [_Share(future, i)]))
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def results(self):
+        try:
+            for item, futures in self.jobs:
+                yield item, [f.result() for f in futures]
+        finally:
+            self.pool.shutdown(wait=True)
+
+
+class _Share:
+    # One item's result out of a batch call
+    def __init__(self, future, index):
+        self.future = future
+        self.index = index
+
+    def result(self):
+        return self.future.result()[self.index]
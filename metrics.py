@@ -0,0 +1,210 @@
+"""In-process pipeline metrics: counters, timing spans and a per-run summary.
+
+Counters and span histograms accumulate for the life of the process and are
+rendered in Prometheus text format by the app's /metrics route. Each feed
+refresh also opens a RunSummary: stage timings, spans recorded against it
+(per source, per post) and the run's counter deltas are written to
+RUN_SUMMARY_PATH next to the feed when it finishes.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+RUN_SUMMARY_PATH = Path(os.environ.get("RUN_SUMMARY_PATH", "public/run_summary.json"))
+
+# Histogram bucket bounds in seconds, from a cached LLM reply up to a slow refresh
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_run = None
+
+# App traffic counters aren't part of a refresh's summary
+_RUN_EXCLUDED = {"http_requests_total"}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _series(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs)
+    return f"{name}{{{body}}}"
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+
+
+class _Timer:
+    __slots__ = ("seconds",)
+
+    def __init__(self):
+        self.seconds = 0.0
+
+
+@contextmanager
+def span(name, run_field=None, run_key=None, **labels):
+    """Time the block into histogram `name`.
+
+    With `run_field`, the duration is also added to the active run summary
+    under run_field/run_key. The yielded timer's `seconds` is set on exit.
+    """
+    timer = _Timer()
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        observe(name, timer.seconds, **labels)
+        run = _run
+        if run is not None and run_field:
+            run.record(run_field, run_key, timer.seconds)
+
+
+def timed(fn, name, run_field=None, run_key=None, **labels):
+    """Wrap a zero-argument callable in a span (for work handed to a pool)."""
+    def call():
+        with span(name, run_field, run_key, **labels):
+            return fn()
+    return call
+
+
+def _counter_snapshot():
+    with _lock:
+        return dict(_counters)
+
+
+class RunSummary:
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started = time.perf_counter()
+        self.before = _counter_snapshot()
+        self.fields = {}
+        self.lock = threading.Lock()
+        self.current_stage = None
+        self.stage_started = None
+
+    def record(self, field, key, seconds):
+        with self.lock:
+            values = self.fields.setdefault(field, {})
+            values[key] = values.get(key, 0.0) + seconds
+
+    def stage(self, name):
+        """Mark the start of stage `name`; the previous stage's span ends here."""
+        if name == self.current_stage:
+            return
+        now = time.perf_counter()
+        if self.current_stage is not None:
+            seconds = now - self.stage_started
+            observe("feed_stage_seconds", seconds, stage=self.current_stage)
+            self.record("stages", self.current_stage, seconds)
+        self.current_stage, self.stage_started = name, now
+
+    def finish(self, status="succeeded", extra=None, path=RUN_SUMMARY_PATH):
+        self.stage(None)
+        duration = time.perf_counter() - self.started
+        observe("feed_run_seconds", duration, status=status)
+        inc("feed_runs_total", status=status)
+        set_gauge("feed_last_run_timestamp_seconds", time.time(), status=status)
+
+        after = _counter_snapshot()
+        counters = {
+            _series(name, labels): value - self.before.get((name, labels), 0)
+            for (name, labels), value in sorted(after.items())
+            if name not in _RUN_EXCLUDED and value != self.before.get((name, labels), 0)
+        }
+        with self.lock:
+            fields = {f: {k: round(v, 4) for k, v in values.items()} for f, values in self.fields.items()}
+        summary = {
+            "started_at": self.started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "status": status,
+            "seconds": round(duration, 3),
+            **fields,
+            "counters": counters,
+            **(extra or {}),
+        }
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        return summary
+
+
+def start_run():
+    """Open the summary for a new refresh (replacing one left by a failed run)."""
+    global _run
+    _run = RunSummary()
+    return _run
+
+
+def finish_run(status="succeeded", extra=None):
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return None
+    return run.finish(status, extra)
+
+
+def render():
+    """Every metric in Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        gauges = sorted(_gauges.items())
+        histograms = sorted((k, dict(v, buckets=list(v["buckets"]))) for k, v in _histograms.items())
+
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        declare(name, "counter")
+        lines.append(f"{_series(name, labels)} {value}")
+    for (name, labels), value in gauges:
+        declare(name, "gauge")
+        lines.append(f"{_series(name, labels)} {value}")
+    for (name, labels), hist in histograms:
+        declare(name, "histogram")
+        for bound, count in zip(BUCKETS, hist["buckets"]):
+            lines.append(f"{_series(name + '_bucket', labels, [('le', f'{bound:g}')])} {count}")
+        lines.append(f"{_series(name + '_bucket', labels, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{_series(name + '_sum', labels)} {hist['sum']:.6f}")
+        lines.append(f"{_series(name + '_count', labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
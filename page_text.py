@@ -0,0 +1,112 @@
+"""Fast, size-capped text extraction for article pages and feed HTML.
+
+Uses the stdlib HTMLParser as a streaming tokenizer instead of building a
+BeautifulSoup tree. Text comes out the same way `Tag.get_text(strip=True)`
+produced it: each text node stripped and joined without a separator, with
+script/style contents and comments left out.
+"""
+import codecs
+import os
+from html.parser import HTMLParser
+
+PAGE_MAX_BYTES = int(os.environ.get("PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+PAGE_TEXT_MAX_CHARS = int(os.environ.get("PAGE_TEXT_MAX_CHARS", "8000"))
+
+SKIP_TAGS = {"script", "style", "template"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+class _TextCollector(HTMLParser):
+    def __init__(self, paragraphs_only):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs_only = paragraphs_only
+        # Open elements; an end tag closes everything opened after its match
+        self.stack = []
+        self.skip = 0
+        self.p_level = None
+        self.pieces = []
+        self.paragraphs = []
+        self.chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        self.stack.append(tag)
+        if tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag == "p" and self.paragraphs_only and self.p_level is None:
+            self.p_level = len(self.stack)
+            self.pieces = []
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            closed = self.stack.pop()
+            if closed in SKIP_TAGS:
+                self.skip -= 1
+            if self.p_level is not None and len(self.stack) < self.p_level:
+                self._end_paragraph()
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        if self.skip or (self.paragraphs_only and self.p_level is None):
+            return
+        piece = data.strip()
+        if piece:
+            self.pieces.append(piece)
+
+    def _end_paragraph(self):
+        self.p_level = None
+        text = "".join(self.pieces)
+        self.pieces = []
+        if text:
+            self.paragraphs.append(text)
+            self.chars += len(text) + 1
+
+    def close(self):
+        super().close()
+        if self.p_level is not None:
+            self._end_paragraph()
+
+
+def html_to_text(html):
+    """All visible text of an HTML fragment, like get_text(strip=True)."""
+    collector = _TextCollector(paragraphs_only=False)
+    collector.feed(html)
+    collector.close()
+    return "".join(collector.pieces)
+
+
+def paragraphs_text(html):
+    """Text of every <p> in a document, joined with spaces."""
+    collector = _TextCollector(paragraphs_only=True)
+    collector.feed(html)
+    collector.close()
+    return " ".join(collector.paragraphs).strip()
+
+
+def stream_paragraphs_text(response, max_bytes=None, max_chars=None):
+    """Pull <p> text from a streamed response, stopping early once enough is read.
+
+    Reads at most `max_bytes` of body and stops as soon as `max_chars` of
+    paragraph text has been collected. Returns (text, bytes_read).
+    """
+    max_bytes = max_bytes or PAGE_MAX_BYTES
+    max_chars = max_chars or PAGE_TEXT_MAX_CHARS
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+    collector = _TextCollector(paragraphs_only=True)
+    size = 0
+    for chunk in response.iter_content(chunk_size=16 * 1024):
+        size += len(chunk)
+        collector.feed(decoder.decode(chunk))
+        if collector.chars >= max_chars or size >= max_bytes:
+            break
+    else:
+        collector.feed(decoder.decode(b"", final=True))
+    collector.close()
+    return " ".join(collector.paragraphs).strip()[:max_chars], size
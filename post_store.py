@@ -0,0 +1,511 @@
+"""SQLite-backed store for feed posts and deleted-link tombstones.
+
+Posts are rows keyed by link, indexed by source and timestamp, with the full
+post kept as JSON. Deletes and source purges are single indexed statements in
+a transaction, and the public feed JSON is a projection of the table rather
+than the source of truth. Every write bumps a version counter so readers
+(the in-memory /feed cache) know when to rebuild.
+
+Scraped source text stays out of the post JSON: a post's raw_content is
+replaced by its content_hash on write, and the text is kept zlib-compressed
+in a content-addressed `contents` table, read only when asked for. Each text's
+near-duplicate signature is computed once, when it's first written, and
+stored beside it.
+
+On first use an empty store imports the legacy public/summarized_feed.json
+and public/deleted_links.json. `export_json` keeps both files in step with the
+table after every write, so a re-import never brings back a deleted post.
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import dedup
+import metrics
+
+POST_STORE_PATH = Path(os.environ.get("POST_STORE_PATH", "data/feed.db"))
+LEGACY_FEED_PATH = Path("public/summarized_feed.json")
+LEGACY_DELETED_PATH = Path("public/deleted_links.json")
+
+_export_lock = threading.Lock()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    link TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    ts REAL NOT NULL,
+    rank INTEGER NOT NULL,
+    sentiment TEXT NOT NULL DEFAULT '',
+    content_hash TEXT NOT NULL DEFAULT '',
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_source_ts ON posts (source, ts);
+CREATE INDEX IF NOT EXISTS posts_ts ON posts (ts);
+CREATE INDEX IF NOT EXISTS posts_rank ON posts (rank);
+CREATE INDEX IF NOT EXISTS posts_source_rank ON posts (source, rank);
+CREATE INDEX IF NOT EXISTS posts_sentiment_rank ON posts (sentiment, rank);
+CREATE TABLE IF NOT EXISTS post_tags (
+    tag TEXT NOT NULL,
+    link TEXT NOT NULL,
+    PRIMARY KEY (tag, link)
+);
+CREATE INDEX IF NOT EXISTS post_tags_link ON post_tags (link);
+CREATE TABLE IF NOT EXISTS deleted_links (
+    link TEXT PRIMARY KEY,
+    deleted_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contents (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    signature BLOB
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _epoch(timestamp):
+    try:
+        ts = datetime.fromisoformat(timestamp)
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _dumps(post):
+    return json.dumps(post, ensure_ascii=False, sort_keys=True)
+
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:32]
+
+
+def _split(post):
+    """The stored form of `post`, plus (hash, text) if it carried raw_content."""
+    if "raw_content" not in post:
+        return post, None
+    text = post["raw_content"] or ""
+    slim = {k: v for k, v in post.items() if k != "raw_content"}
+    slim["content_hash"] = content_hash(text)
+    return slim, (slim["content_hash"], text)
+
+
+def _row(post, rank):
+    return (
+        post["link"],
+        post.get("source", ""),
+        post.get("timestamp", ""),
+        _epoch(post.get("timestamp")),
+        rank,
+        str(post.get("sentiment") or "").lower(),
+        post.get("content_hash", ""),
+        _dumps(post)
+    )
+
+
+def _tags(post):
+    tags = post.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    return {str(t).strip().lower() for t in tags if str(t).strip()}
+
+
+def encode_cursor(rank, link):
+    raw = json.dumps([rank, link], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, link = json.loads(raw)
+        return int(rank), str(link)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _write_json(path, data):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    metrics.inc("store_bytes_written_total", tmp.stat().st_size, target="json")
+    os.replace(tmp, path)
+
+
+class PostStore:
+    def __init__(self, path=POST_STORE_PATH):
+        self.path = Path(path)
+        self.ready = False
+        self.init_lock = threading.Lock()
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init(self):
+        with self.init_lock:
+            if self.ready:
+                return
+            conn = self._open()
+            try:
+                self._upgrade(conn)
+                conn.executescript(SCHEMA)
+                if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone() is None:
+                    self._migrate_legacy(conn)
+            finally:
+                conn.close()
+            self.ready = True
+
+    @contextmanager
+    def _connect(self, write=False):
+        if not self.ready:
+            self._init()
+        conn = self._open()
+        try:
+            if write:
+                # Take the write lock up front so concurrent writers queue instead of clobbering
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                    conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('version', '1') "
+                        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                    )
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+            else:
+                yield conn
+        finally:
+            conn.close()
+
+    def _upgrade(self, conn):
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(posts)")}
+        if not columns:
+            return
+        if "sentiment" not in columns:
+            self._upgrade_sentiment(conn)
+        if "content_hash" not in columns:
+            self._upgrade_contents(conn)
+        if "signature" not in {row[1] for row in conn.execute("PRAGMA table_info(contents)")}:
+            self._upgrade_signatures(conn)
+
+    def _upgrade_sentiment(self, conn):
+        # Stores created before sentiment/tag indexing: add the column and backfill
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ALTER TABLE posts ADD COLUMN sentiment TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE TABLE IF NOT EXISTS post_tags (tag TEXT NOT NULL, link TEXT NOT NULL, PRIMARY KEY (tag, link))")
+        for link, data in conn.execute("SELECT link, data FROM posts").fetchall():
+            post = json.loads(data)
+            conn.execute("UPDATE posts SET sentiment = ? WHERE link = ?", (str(post.get("sentiment") or "").lower(), link))
+            conn.executemany("INSERT OR IGNORE INTO post_tags (tag, link) VALUES (?, ?)", [(t, link) for t in _tags(post)])
+        conn.execute("COMMIT")
+
+    def _upgrade_contents(self, conn):
+        # Stores that kept raw_content inside each post: move it to the contents table
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ALTER TABLE posts ADD COLUMN content_hash TEXT NOT NULL DEFAULT ''")
+        conn.execute("CREATE TABLE IF NOT EXISTS contents (hash TEXT PRIMARY KEY, data BLOB NOT NULL, signature BLOB)")
+        for link, data in conn.execute("SELECT link, data FROM posts").fetchall():
+            slim, content = _split(json.loads(data))
+            if content:
+                self._put_contents(conn, [content])
+                conn.execute("UPDATE posts SET content_hash = ?, data = ? WHERE link = ?", (slim["content_hash"], _dumps(slim), link))
+        conn.execute("COMMIT")
+        conn.execute("VACUUM")
+
+    def _upgrade_signatures(self, conn):
+        # Stores from before signatures were kept: compute them once for the stored text
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("ALTER TABLE contents ADD COLUMN signature BLOB")
+        rows = conn.execute("SELECT hash, data FROM contents").fetchall()
+        conn.executemany(
+            "UPDATE contents SET signature = ? WHERE hash = ?",
+            [(dedup.pack(dedup.signature(zlib.decompress(data).decode("utf-8"))), digest) for digest, data in rows]
+        )
+        conn.execute("COMMIT")
+
+    def _migrate_legacy(self, conn):
+        posts, recap, recap_time = [], None, None
+        if LEGACY_FEED_PATH.exists():
+            try:
+                with open(LEGACY_FEED_PATH, "r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                if isinstance(loaded, list):
+                    posts = loaded
+                elif isinstance(loaded, dict):
+                    posts = loaded.get("posts", [])
+                    recap, recap_time = loaded.get("recap"), loaded.get("recap_time")
+            except Exception as e:
+                print(f"⚠️ Failed to import legacy feed: {e}")
+
+        deleted = []
+        if LEGACY_DELETED_PATH.exists():
+            try:
+                with open(LEGACY_DELETED_PATH, "r", encoding="utf-8") as f:
+                    deleted = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Failed to import legacy deleted links: {e}")
+
+        conn.execute("BEGIN IMMEDIATE")
+        tombstoned = set(deleted)
+        self._insert_posts(conn, [p for p in posts if p.get("link") not in tombstoned])
+        now = datetime.now(timezone.utc).isoformat()
+        conn.executemany(
+            "INSERT OR IGNORE INTO deleted_links (link, deleted_at) VALUES (?, ?)",
+            [(link, now) for link in deleted]
+        )
+        self._set_meta(conn, {"recap": recap, "recap_time": recap_time, "migrated": now})
+        conn.execute("COMMIT")
+        if posts or deleted:
+            print(f"📦 Imported {len(posts)} posts and {len(deleted)} deleted links into {self.path}")
+
+    def _insert_posts(self, conn, posts, start_rank=0):
+        self._write_rows(conn, [(start_rank + i, p) for i, p in enumerate(posts)])
+
+    def _put_contents(self, conn, contents):
+        contents = dict(contents)
+        hashes = list(contents)
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            for (digest,) in conn.execute(f"SELECT hash FROM contents WHERE hash IN ({','.join('?' * len(chunk))})", chunk):
+                # Already stored, with its signature
+                contents.pop(digest)
+        conn.executemany(
+            "INSERT INTO contents (hash, data, signature) VALUES (?, ?, ?)",
+            [(h, zlib.compress(text.encode("utf-8"), 6), dedup.pack(dedup.signature(text))) for h, text in contents.items()]
+        )
+
+    def _write_rows(self, conn, ranked_posts):
+        split = [(rank, _split(p)) for rank, p in ranked_posts]
+        self._put_contents(conn, [content for _, (_, content) in split if content])
+        ranked_posts = [(rank, slim) for rank, (slim, _) in split]
+        rows = [_row(p, rank) for rank, p in ranked_posts]
+        conn.executemany("DELETE FROM post_tags WHERE link = ?", [(p["link"],) for _, p in ranked_posts])
+        conn.executemany(
+            "INSERT OR REPLACE INTO posts (link, source, timestamp, ts, rank, sentiment, content_hash, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        metrics.inc("store_bytes_written_total", sum(len(row[-1].encode("utf-8")) for row in rows), target="db")
+        conn.executemany(
+            "INSERT OR IGNORE INTO post_tags (tag, link) VALUES (?, ?)",
+            [(tag, p["link"]) for _, p in ranked_posts for tag in _tags(p)]
+        )
+
+    def _set_meta(self, conn, values):
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(k, json.dumps(v, ensure_ascii=False)) for k, v in values.items()]
+        )
+
+    # --- reads ---
+
+    def version(self):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def get_meta(self, key, default=None):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else default
+
+    def load_posts(self):
+        """All posts in feed order."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM posts ORDER BY rank").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def posts_by_link(self):
+        return {p["link"]: p for p in self.load_posts()}
+
+    def deleted_links(self):
+        with self._connect() as conn:
+            return {link for (link,) in conn.execute("SELECT link FROM deleted_links")}
+
+    def content(self, digest):
+        """The raw text stored under `digest`, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM contents WHERE hash = ?", (digest,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def iter_contents(self, digests, batch=200):
+        """Yield (hash, text) for each stored hash in `digests`, a batch at a time."""
+        digests = list(digests)
+        for i in range(0, len(digests), batch):
+            chunk = digests[i:i + batch]
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT hash, data FROM contents WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            for digest, data in rows:
+                yield digest, zlib.decompress(data).decode("utf-8")
+
+    def iter_signatures(self, digests, batch=200):
+        """Yield (hash, near-duplicate signature or None) for each stored hash in `digests`."""
+        digests = list(digests)
+        for i in range(0, len(digests), batch):
+            chunk = digests[i:i + batch]
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT hash, signature FROM contents WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            for digest, blob in rows:
+                yield digest, dedup.unpack(blob)
+
+    def is_deleted(self, link):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM deleted_links WHERE link = ?", (link,)).fetchone() is not None
+
+    def projection(self):
+        """The public feed document: recap, recap_time and ordered posts."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT data FROM posts ORDER BY rank").fetchall()
+            meta = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('recap', 'recap_time')").fetchall())
+        return {
+            "recap": json.loads(meta["recap"]) if meta.get("recap") else None,
+            "recap_time": json.loads(meta["recap_time"]) if meta.get("recap_time") else None,
+            "posts": [json.loads(data) for (data,) in rows]
+        }
+
+    def query(self, source=None, tag=None, sentiment=None, since=None, until=None, cursor=None, limit=50):
+        """One page of posts in feed order, filtered on indexed columns.
+
+        `since`/`until` are epoch seconds (inclusive/exclusive). The cursor
+        names the last post of the previous page; if that post is still in
+        the feed, the next page resumes right after its current position.
+        Returns (posts, next_cursor).
+        """
+        clauses, params = [], []
+        with self._connect() as conn:
+            if cursor:
+                after_rank, after_link = decode_cursor(cursor)
+                row = conn.execute("SELECT rank FROM posts WHERE link = ?", (after_link,)).fetchone()
+                clauses.append("p.rank > ?")
+                params.append(row[0] if row else after_rank)
+            if source:
+                clauses.append("p.source = ?")
+                params.append(source)
+            if sentiment:
+                clauses.append("p.sentiment = ?")
+                params.append(sentiment.lower())
+            if since is not None:
+                clauses.append("p.ts >= ?")
+                params.append(since)
+            if until is not None:
+                clauses.append("p.ts < ?")
+                params.append(until)
+            if tag:
+                clauses.append("p.link IN (SELECT link FROM post_tags WHERE tag = ?)")
+                params.append(tag.strip().lower())
+
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = conn.execute(
+                f"SELECT p.rank, p.link, p.data FROM posts p {where} ORDER BY p.rank LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+
+        next_cursor = encode_cursor(rows[limit - 1][0], rows[limit - 1][1]) if len(rows) > limit else None
+        return [json.loads(data) for _, _, data in rows[:limit]], next_cursor
+
+    # --- writes ---
+
+    def delete_post(self, link):
+        """Remove a post and tombstone its link. Returns the number of posts removed."""
+        with self._connect(write=True) as conn:
+            removed = conn.execute("DELETE FROM posts WHERE link = ?", (link,)).rowcount
+            conn.execute("DELETE FROM post_tags WHERE link = ?", (link,))
+            conn.execute(
+                "INSERT OR IGNORE INTO deleted_links (link, deleted_at) VALUES (?, ?)",
+                (link, datetime.now(timezone.utc).isoformat())
+            )
+        return removed
+
+    def purge_sources(self, prefix):
+        """Remove every post whose source starts with `prefix`. Returns (removed links, remaining count)."""
+        # GLOB (unlike LIKE) is case-sensitive and can use the source index
+        pattern = prefix.replace("[", "[[]").replace("*", "[*]").replace("?", "[?]") + "*"
+        with self._connect(write=True) as conn:
+            removed = [link for (link,) in conn.execute("SELECT link FROM posts WHERE source GLOB ?", (pattern,))]
+            conn.executemany("DELETE FROM post_tags WHERE link = ?", [(link,) for link in removed])
+            conn.execute("DELETE FROM posts WHERE source GLOB ?", (pattern,))
+            remaining = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        return removed, remaining
+
+    def clear_posts(self):
+        with self._connect(write=True) as conn:
+            conn.execute("DELETE FROM posts")
+            conn.execute("DELETE FROM post_tags")
+
+    def restore(self, posts):
+        """Replace every post with `posts`, in the given order."""
+        with self._connect(write=True) as conn:
+            conn.execute("DELETE FROM posts")
+            conn.execute("DELETE FROM post_tags")
+            self._insert_posts(conn, posts)
+
+    def save_feed(self, posts, recap, recap_time, recap_state=None):
+        """Make the stored feed match `posts` (in order), touching only rows that changed.
+
+        Returns (added posts, updated posts, removed links); posts that only
+        moved in the ranking count as neither.
+
+        `recap_state` is daily_recap.build_recap's bookkeeping, kept for the next run.
+
+        Links tombstoned since the caller loaded the feed are dropped, so a
+        delete that lands mid-refresh isn't undone.
+        """
+        with self._connect(write=True) as conn:
+            deleted = {link for (link,) in conn.execute("SELECT link FROM deleted_links")}
+            posts = [p for p in posts if p["link"] not in deleted]
+            current = {link: (rank, data) for link, rank, data in conn.execute("SELECT link, rank, data FROM posts")}
+            keep = {p["link"] for p in posts}
+
+            stale = [(link,) for link in current if link not in keep]
+            conn.executemany("DELETE FROM posts WHERE link = ?", stale)
+            conn.executemany("DELETE FROM post_tags WHERE link = ?", stale)
+
+            changed, reranked, added, updated = [], [], [], []
+            for rank, post in enumerate(posts):
+                slim, _ = _split(post)
+                old = current.get(post["link"])
+                if old is None or old[1] != _dumps(slim):
+                    changed.append((rank, post))
+                    (added if old is None else updated).append(slim)
+                elif old[0] != rank:
+                    reranked.append((rank, post["link"]))
+            self._write_rows(conn, changed)
+            conn.executemany("UPDATE posts SET rank = ? WHERE link = ?", reranked)
+            # Text no post points at any more
+            conn.execute("DELETE FROM contents WHERE hash NOT IN (SELECT content_hash FROM posts)")
+            self._set_meta(conn, {"recap": recap, "recap_time": recap_time, "recap_state": recap_state})
+        return added, updated, [link for (link,) in stale]
+
+    def export_json(self, path=LEGACY_FEED_PATH, deleted_path=LEGACY_DELETED_PATH):
+        """Write the public projection to `path`, and the tombstones to `deleted_path`,
+        for consumers that read the files."""
+        # Refreshes and deletes both export; one at a time so they don't share a .tmp
+        with _export_lock:
+            _write_json(path, self.projection())
+            _write_json(deleted_path, sorted(self.deleted_links()))
+
+
+store = PostStore()
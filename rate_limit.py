@@ -0,0 +1,43 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        """Change the refill rate (tokens already in the bucket are kept)."""
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def delay(self, tokens=1):
+        """Seconds until `tokens` could be taken, without taking them."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                return 0.0
+            return (tokens - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def acquire(self, tokens=1):
+        # Block until `tokens` are available, then take them
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                delay = (tokens - self.tokens) / self.rate if self.rate > 0 else 1.0
+            time.sleep(delay)
@@ -1,76 +1,285 @@
+"""Cross-post new feed posts to r/WhiteHouseFeed.
+
+State lives in posted_reddit_links.json: the backend's /feed/changes cursor,
+the links already posted, and an outbox of posts waiting to be submitted. Each
+run pulls only the changes since its cursor into the outbox, then drains the
+outbox behind a token bucket whose rate follows Reddit's rate-limit headers.
+Failed submissions stay queued with backoff until REDDIT_MAX_ATTEMPTS, and
+the state file is rewritten atomically after every submission, so a run that
+dies midway neither loses nor double-posts anything.
+
+`main(reddit=...)` accepts any object with PRAW's `subreddit(name).submit(...)`
+and `auth.limits`, so the bot can be driven by a fake client.
+"""
 import json
-import time
 import os
-import praw
-import requests
-from datetime import datetime, timezone
+import re
+import time
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from urllib.parse import quote
+
 from dotenv import load_dotenv
+
+import http_client
+from rate_limit import TokenBucket
+
 load_dotenv()
 
-# === Reddit Auth (from environment variables) ===
-reddit = praw.Reddit(
-    client_id=os.getenv("CLIENT_ID"),
-    client_secret=os.getenv("CLIENT_SECRET"),
-    username=os.getenv("REDDIT_USERNAME"),
-    password=os.getenv("REDDIT_PASSWORD"),
-    user_agent="WhiteHouseFeedBot/0.1 by ProfileEmotional6042"
-)
-
-subreddit_name = "WhiteHouseFeed"
-log_path = Path("posted_reddit_links.json")
-
-# === Load already-posted links ===
-if log_path.exists():
-    with open(log_path, "r") as f:
-        posted_links = set(json.load(f))
-else:
-    posted_links = set()
-
-# === Fetch live feed from backend ===
-try:
-    print("🌐 Fetching live feed from backend...")
-    response = requests.get("https://whfeed-backend.onrender.com/feed")
-    response.raise_for_status()
-    feed_data = response.json()
-except Exception as e:
-    print(f"❌ Failed to fetch feed: {e}")
-    exit(1)
-
-# === Only allow posts from the last 2 hours ===
-cutoff_time = datetime.now(timezone.utc).timestamp() - (2 * 60 * 60)
-
-new_links = []
-for post in feed_data["posts"]:
-    print(f"⏳ Checking post: {post['title']} at {post['timestamp']}")
-    if post["link"] in posted_links:
-        print("⏭️ Already posted")
-        continue
+SUBREDDIT_NAME = os.environ.get("REDDIT_SUBREDDIT", "WhiteHouseFeed")
+FEED_BASE = os.environ.get("REDDIT_FEED_BASE", "https://whfeed-backend.onrender.com").rstrip("/")
+STATE_PATH = Path(os.environ.get("REDDIT_STATE_PATH", "posted_reddit_links.json"))
+SITE_LINK = "https://whitehousefeed.com"
+
+# Only posts from the last 2 hours are cross-posted
+MAX_POST_AGE = timedelta(hours=float(os.environ.get("REDDIT_MAX_POST_AGE_HOURS", "2")))
+# Upper bound on submissions; Reddit's rate-limit headers can only lower it
+SUBMITS_PER_MINUTE = float(os.environ.get("REDDIT_SUBMITS_PER_MINUTE", "20"))
+SUBMIT_BURST = int(os.environ.get("REDDIT_SUBMIT_BURST", "5"))
+# Requests left in Reddit's window that we never spend
+RATE_LIMIT_RESERVE = int(os.environ.get("REDDIT_RATE_LIMIT_RESERVE", "5"))
+MAX_ATTEMPTS = int(os.environ.get("REDDIT_MAX_ATTEMPTS", "5"))
+RETRY_BASE = float(os.environ.get("REDDIT_RETRY_BASE", "60"))
+# Leave the rest of the outbox for the next run rather than overrun the schedule
+RUN_BUDGET = float(os.environ.get("REDDIT_RUN_BUDGET", "600"))
+POSTED_RETENTION = timedelta(days=float(os.environ.get("REDDIT_POSTED_RETENTION_DAYS", "7")))
+FAILED_KEEP = 100
+CHANGES_PAGE = 500
+TITLE_MAX = 300
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def connect():
+    import praw
+    return praw.Reddit(
+        client_id=os.getenv("CLIENT_ID"),
+        client_secret=os.getenv("CLIENT_SECRET"),
+        username=os.getenv("REDDIT_USERNAME"),
+        password=os.getenv("REDDIT_PASSWORD"),
+        user_agent="WhiteHouseFeedBot/0.1 by ProfileEmotional6042"
+    )
+
+
+# === State ===
+
+def load_state(path=STATE_PATH):
+    state = {"cursor": None, "posted": {}, "outbox": [], "failed": []}
+    if not path.exists():
+        return state
+    with open(path, "r", encoding="utf-8") as f:
+        loaded = json.load(f)
+    if isinstance(loaded, list):
+        # Legacy format: a bare list of posted links
+        now = _now().isoformat()
+        state["posted"] = {link: now for link in loaded}
+    else:
+        state.update(loaded)
+    return state
+
+
+def save_state(state, path=STATE_PATH):
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def prune(state, now):
+    # Links older than the retention window can't come back inside MAX_POST_AGE
+    cutoff = (now - POSTED_RETENTION).isoformat()
+    state["posted"] = {link: at for link, at in state["posted"].items() if at >= cutoff}
+    state["failed"] = state["failed"][-FAILED_KEEP:]
+
+
+# === Feed delta ===
+
+def fetch_changes(cursor, feed_base=FEED_BASE):
+    """Return (posts to consider, removed links, new cursor).
+
+    Falls back to the whole /feed when the backend has no /feed/changes.
+    """
+    posts, removed = {}, set()
+    while True:
+        url = f"{feed_base}/feed/changes?limit={CHANGES_PAGE}"
+        if cursor:
+            url += f"&since={quote(cursor)}"
+        response = http_client.get(url, timeout=30)
+        if response.status_code == 404:
+            response = http_client.get(f"{feed_base}/feed", timeout=30)
+            response.raise_for_status()
+            return response.json()["posts"], set(), None
+        response.raise_for_status()
+        data = response.json()
+
+        if data["resync"]:
+            print("🔄 Cursor not recognised by the backend, scanning the whole feed")
+            posts = {p["link"]: p for p in data["feed"]["posts"]}
+            removed = set()
+        for event in data["events"]:
+            if event["type"] in ("added", "updated"):
+                posts[event["link"]] = event["post"]
+                removed.discard(event["link"])
+            elif event["type"] == "removed":
+                posts.pop(event["link"], None)
+                removed.add(event["link"])
+        cursor = data["cursor"]
+        if len(data["events"]) < CHANGES_PAGE:
+            return list(posts.values()), removed, cursor
 
+
+def enqueue(state, posts, removed, now):
+    """Add fresh, unposted posts to the outbox; drop queued posts that were removed."""
+    cutoff = (now - MAX_POST_AGE).timestamp()
+    queued = {item["link"]: item for item in state["outbox"]}
+    state["outbox"] = [item for item in state["outbox"] if item["link"] not in removed]
+    added = 0
+    for post in posts:
+        link = post["link"]
+        if link in state["posted"]:
+            continue
+        if link in queued:
+            # Pick up edits to a post that hasn't gone out yet
+            queued[link].update(title=post["title"], summary=post["summary"])
+            continue
+        try:
+            if datetime.fromisoformat(post["timestamp"]).timestamp() < cutoff:
+                continue
+        except Exception:
+            print(f"⚠️ Skipping due to bad timestamp in post: {post.get('title', 'No Title')}")
+            continue
+        state["outbox"].append({
+            "link": link,
+            "title": post["title"],
+            "summary": post["summary"],
+            "timestamp": post["timestamp"],
+            "attempts": 0,
+            "next_attempt": None,
+            "last_error": None,
+        })
+        added += 1
+    # Oldest first, so Reddit shows them in the order they happened
+    state["outbox"].sort(key=lambda item: item["timestamp"])
+    return added
+
+
+# === Submission ===
+
+def update_rate(bucket, limits, now=None):
+    """Slow the bucket down to what's left of Reddit's current rate-limit window."""
+    remaining, reset = limits.get("remaining"), limits.get("reset_timestamp")
+    if remaining is None or reset is None:
+        return
+    window = max(1.0, reset - (now or time.time()))
+    usable = max(0.0, float(remaining) - RATE_LIMIT_RESERVE)
+    bucket.set_rate(min(SUBMITS_PER_MINUTE / 60.0, max(usable, 1.0) / window))
+
+
+def retry_after(error):
+    """Seconds Reddit asked us to wait in a RATELIMIT error, if it's one."""
+    for item in getattr(error, "items", None) or []:
+        if getattr(item, "error_type", None) == "RATELIMIT":
+            match = re.search(r"(\d+)\s*(minute|second)", item.message or "")
+            if not match:
+                return RETRY_BASE
+            amount = int(match.group(1))
+            return amount * 60 if match.group(2) == "minute" else amount
+    return None
+
+
+def is_permanent(error):
+    # Validation errors (bad title, banned, etc.) won't succeed on retry
     try:
-        post_time = datetime.fromisoformat(post["timestamp"]).timestamp()
-        if post_time < cutoff_time:
-            print("⏭️ Skipping (too old)")
+        from praw.exceptions import RedditAPIException
+        from prawcore.exceptions import Forbidden, BadRequest
+    except ImportError:
+        return False
+    if isinstance(error, (Forbidden, BadRequest)):
+        return True
+    return isinstance(error, RedditAPIException) and retry_after(error) is None
+
+
+def submit(reddit, item):
+    body = f"{item['summary']}\n\n[More at WhiteHouseFeed]({SITE_LINK})"
+    reddit.subreddit(SUBREDDIT_NAME).submit(title=item["title"][:TITLE_MAX], selftext=body)
+
+
+def drain(reddit, state, save, bucket=None, budget=RUN_BUDGET):
+    """Submit due outbox items until it's empty or the run budget is spent."""
+    bucket = bucket or TokenBucket(SUBMITS_PER_MINUTE / 60.0, capacity=SUBMIT_BURST)
+    deadline = time.monotonic() + budget
+    posted = 0
+    for item in list(state["outbox"]):
+        now = _now()
+        if item["next_attempt"] and item["next_attempt"] > now.isoformat():
             continue
-    except Exception as e:
-        print(f"⚠️ Skipping due to bad timestamp in post: {post.get('title', 'No Title')}")
-        continue
+        wait = bucket.delay()
+        if wait > deadline - time.monotonic():
+            print(f"⏸️ Rate limit leaves no room this run; {len(state['outbox'])} posts stay queued")
+            break
+        bucket.acquire()
+
+        try:
+            submit(reddit, item)
+        except Exception as e:
+            item["attempts"] += 1
+            item["last_error"] = str(e)
+            pause = retry_after(e)
+            if is_permanent(e) or item["attempts"] >= MAX_ATTEMPTS:
+                print(f"❌ Giving up on {item['title']}: {e}")
+                state["outbox"].remove(item)
+                state["failed"].append(item)
+            else:
+                delay = pause if pause is not None else RETRY_BASE * 2 ** (item["attempts"] - 1)
+                item["next_attempt"] = (now + timedelta(seconds=delay)).isoformat()
+                print(f"⚠️ Failed to post {item['title']} (attempt {item['attempts']}), retrying in {delay:.0f}s: {e}")
+            save(state)
+            if pause is not None:
+                # The whole account is rate limited, not just this post
+                break
+            continue
+        finally:
+            update_rate(bucket, reddit.auth.limits)
 
-    # === Format Reddit Post ===
-    title = post["title"]
-    summary = post["summary"]
-    link = "https://whitehousefeed.com"
-    body = f"{summary}\n\n[More at WhiteHouseFeed]({link})"
+        print(f"✅ Posted to Reddit: {item['title']}")
+        state["outbox"].remove(item)
+        state["posted"][item["link"]] = now.isoformat()
+        posted += 1
+        save(state)
+    return posted
 
+
+def main(reddit=None, feed_base=FEED_BASE, state_path=STATE_PATH, bucket=None, budget=RUN_BUDGET):
+    state = load_state(state_path)
+    now = _now()
+
+    fetch_error = None
     try:
-        reddit.subreddit(subreddit_name).submit(title=title, selftext=body)
-        print(f"✅ Posted to Reddit: {title}")
-        posted_links.add(post["link"])
-        new_links.append(post["link"])
-        time.sleep(10)  # Prevent rate-limiting
+        print("🌐 Fetching feed changes from backend...")
+        posts, removed, cursor = fetch_changes(state["cursor"], feed_base)
     except Exception as e:
-        print(f"❌ Failed to post {title}: {e}")
+        print(f"❌ Failed to fetch feed: {e}")
+        # Still work through anything queued by earlier runs, then fail the job
+        fetch_error = e
+        posts, removed, cursor = [], set(), state["cursor"]
+
+    added = enqueue(state, posts, removed, now)
+    state["cursor"] = cursor
+    prune(state, now)
+    save_state(state, state_path)
+    print(f"📬 {added} new posts queued, {len(state['outbox'])} in the outbox")
+
+    posted = 0
+    if state["outbox"]:
+        reddit = reddit or connect()
+        posted = drain(reddit, state, lambda s: save_state(s, state_path), bucket, budget)
+        print(f"📮 Posted {posted}, {len(state['outbox'])} still queued, {len(state['failed'])} failed")
+    if fetch_error is not None:
+        raise fetch_error
+    return posted
+
 
-# === Save log ===
-with open(log_path, "w", encoding="utf-8") as f:
-    json.dump(list(posted_links), f, indent=2)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Adaptive polling intervals for each feed source.
+
+Learns how often a source publishes from the item timestamps it returns and
+polls it about twice per expected item, between SCHEDULE_MIN_INTERVAL and
+SCHEDULE_MAX_INTERVAL. Polls that turn up nothing new stretch the interval,
+errors back it off exponentially, and a new item snaps it back to the learned
+rate. Priority sources (Truth Social, White House) never wait longer than
+SCHEDULE_PRIORITY_INTERVAL except while erroring.
+
+State is kept in SCHEDULE_PATH so `run_main(only_due=True)` can skip every
+source that isn't due yet.
+"""
+import os
+import time
+from pathlib import Path
+
+from dateutil import parser
+
+from json_state import JsonState
+
+SCHEDULE_PATH = Path(os.environ.get("SCHEDULE_PATH", "cache/source_schedule.json"))
+SCHEDULE_MIN_INTERVAL = float(os.environ.get("SCHEDULE_MIN_INTERVAL", "300"))
+SCHEDULE_MAX_INTERVAL = float(os.environ.get("SCHEDULE_MAX_INTERVAL", str(6 * 3600)))
+SCHEDULE_PRIORITY_INTERVAL = float(os.environ.get("SCHEDULE_PRIORITY_INTERVAL", "60"))
+PRIORITY_SOURCES = {"Truth Social", "White House"}
+
+# Poll twice per expected item; stretch by half again after each empty poll
+POLL_FACTOR = 0.5
+QUIET_BACKOFF = 1.5
+HISTORY = 20
+
+_state = JsonState(SCHEDULE_PATH, "source schedule", ("due", "skipped"))
+stats = _state.stats
+_lock = _state.lock
+_load = _state.data
+save = _state.save
+reset_stats = _state.reset_stats
+
+
+def _limits(source):
+    """(shortest, longest normal, longest while erroring) interval for `source`."""
+    if source in PRIORITY_SOURCES:
+        return 0.0, SCHEDULE_PRIORITY_INTERVAL, SCHEDULE_PRIORITY_INTERVAL * 8
+    return SCHEDULE_MIN_INTERVAL, SCHEDULE_MAX_INTERVAL, SCHEDULE_MAX_INTERVAL
+
+
+def _epoch(published):
+    try:
+        return parser.parse(published).timestamp()
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def is_due(source, now=None):
+    with _lock:
+        entry = _load().get(source)
+    return entry is None or (now or time.time()) >= entry.get("next_due", 0)
+
+
+def due(sources, now=None):
+    """The subset of `sources` whose interval has elapsed."""
+    now = now or time.time()
+    picked = [source for source in sources if is_due(source, now)]
+    with _lock:
+        stats["due"] += len(picked)
+        stats["skipped"] += len(sources) - len(picked)
+    return picked
+
+
+def record(source, published=(), error=False, now=None):
+    """Update `source`'s interval after a poll that returned items published at `published`."""
+    now = now or time.time()
+    lowest, highest, highest_error = _limits(source)
+    with _lock:
+        entry = _load().setdefault(source, {"interval": lowest, "errors": 0, "seen": [], "last_item": 0})
+
+        if error:
+            entry["errors"] += 1
+            # Double on every consecutive failure
+            interval = min(max(entry["interval"], SCHEDULE_MIN_INTERVAL / 4) * 2, highest_error)
+        else:
+            entry["errors"] = 0
+            stamps = [t for t in (_epoch(p) for p in published) if t is not None and t <= now]
+            fresh = [t for t in stamps if t > entry["last_item"]]
+            seen = sorted(set(entry["seen"]) | set(stamps))[-HISTORY:]
+            entry["seen"] = seen
+            if len(seen) >= 2:
+                learned = (seen[-1] - seen[0]) / (len(seen) - 1) * POLL_FACTOR
+            else:
+                learned = entry["interval"]
+            if fresh:
+                entry["last_item"] = max(fresh)
+                interval = learned
+            else:
+                interval = max(learned, entry["interval"]) * QUIET_BACKOFF
+            interval = min(max(interval, lowest), highest)
+
+        entry["interval"] = interval
+        entry["last_polled"] = now
+        entry["next_due"] = now + interval
+
+
+def forget(source):
+    """Make `source` due on the next refresh."""
+    with _lock:
+        entry = _load().get(source)
+        if entry:
+            entry["next_due"] = 0
+
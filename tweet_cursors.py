@@ -0,0 +1,82 @@
+"""Per-account "last seen" cursors for the X feeds.
+
+Persists the newest tweet id and timestamp seen for each account in
+TWEET_CURSORS_PATH so a refresh only hands newer tweets to process_entry,
+and skips the API call entirely for an account checked within the last
+TWEET_MIN_INTERVAL seconds (e.g. a cron and a manual refresh overlapping).
+"""
+import os
+import time
+from pathlib import Path
+
+from dateutil import parser
+
+from json_state import JsonState
+
+TWEET_CURSORS_PATH = Path(os.environ.get("TWEET_CURSORS_PATH", "cache/tweet_cursors.json"))
+TWEET_MIN_INTERVAL = float(os.environ.get("TWEET_MIN_INTERVAL", "120"))
+
+_state = JsonState(TWEET_CURSORS_PATH, "tweet cursors", ("calls", "calls_saved", "tweets_new", "tweets_skipped"))
+stats = _state.stats
+_lock = _state.lock
+_load = _state.data
+count = _state.count
+save = _state.save
+reset_stats = _state.reset_stats
+
+
+def _order(tweet_id, created_at):
+    # Tweet ids are time-ordered snowflakes; fall back to the timestamp
+    try:
+        return (0, int(tweet_id))
+    except (TypeError, ValueError):
+        try:
+            return (1, parser.parse(created_at).timestamp())
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+
+def get(username):
+    with _lock:
+        cursor = _load().get(username)
+        return dict(cursor) if cursor else None
+
+
+def is_fresh(cursor):
+    return bool(cursor) and time.time() - cursor.get("checked_at", 0) < TWEET_MIN_INTERVAL
+
+
+def newer_than(tweets, cursor):
+    """Tweets strictly newer than `cursor` (all of them when there is no cursor)."""
+    if not cursor:
+        return list(tweets)
+    last = _order(cursor.get("last_id"), cursor.get("last_created_at"))
+    if last is None:
+        return list(tweets)
+    fresh = []
+    for tweet in tweets:
+        order = _order(tweet.get("id"), tweet.get("created_at"))
+        if order is None or order[0] != last[0] or order > last:
+            fresh.append(tweet)
+    return fresh
+
+
+def advance(username, tweets):
+    """Move the account's cursor to the newest of `tweets`."""
+    with _lock:
+        cursor = _load().get(username) or {}
+        best = _order(cursor.get("last_id"), cursor.get("last_created_at"))
+        for tweet in tweets:
+            order = _order(tweet.get("id"), tweet.get("created_at"))
+            if order is not None and (best is None or (order[0] == best[0] and order > best)):
+                best = order
+                cursor["last_id"] = tweet.get("id")
+                cursor["last_created_at"] = tweet.get("created_at")
+        cursor["checked_at"] = time.time()
+        _load()[username] = cursor
+
+
+def forget(username):
+    with _lock:
+        _load().pop(username, None)
+
@@ -2,18 +2,41 @@ from pathlib import Path
 import os
 import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
 from dotenv import load_dotenv
-import openai
-import feedparser
-import requests
-from bs4 import BeautifulSoup
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from dateutil import parser
 
-# Load environment variables
+import http_cache
+import http_client
+import llm_cache
+import metrics
+import tweet_cursors
+import source_schedule
+from dedup import SimilarityIndex, signature
+from post_store import store, content_hash
+from feed_events import feed_events
+from feed_ranker import FeedRanker, select_recap_posts
+from page_text import html_to_text, stream_paragraphs_text
+from feed_reader import FeedReader
+from llm_queue import chat_completion, cached_completion, remember_completion, SummarizationQueue
+import daily_recap
+
+# Load environment variables; the OpenAI client reads OPENAI_API_KEY on first use
 load_dotenv()
-openai.api_key = os.environ["OPENAI_API_KEY"]
 TWITTER_API_KEY = os.environ.get("TWITTER_API_KEY")
+TWITTER_API_BASE = os.environ.get("TWITTER_API_BASE", "https://api.twitterapi.io").rstrip("/")
+
+# Ingestion: how many sources are fetched at once, and how long one source may take
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "8"))
+SOURCE_DEADLINE = float(os.environ.get("SOURCE_DEADLINE", "20"))
+
+# Short Truth Social and X posts are summarized up to LLM_BATCH_SIZE per request
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "8"))
+LLM_BATCH_MAX_CHARS = int(os.environ.get("LLM_BATCH_MAX_CHARS", "1500"))
+JSON_OBJECT = {"type": "json_object"}
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
@@ -43,13 +66,14 @@ def fetch_tweets(username, count=5):
     if not TWITTER_API_KEY:
         print("❌ Twitter API key missing. Skipping X feeds.")
         return []
-    url = f"https://api.twitterapi.io/twitter/user/last_tweets?userName={username}&limit={count}"
+    url = f"{TWITTER_API_BASE}/twitter/user/last_tweets?userName={username}&limit={count}"
     headers = {"x-api-key": TWITTER_API_KEY}
     try:
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers, timeout=15)
+        metrics.inc("http_bytes_fetched_total", len(response.content))
         if response.status_code == 200:
             data = response.json().get("data", {}).get("tweets", [])
-            return [{"text": t["text"], "link": t["url"], "created_at": t["createdAt"]} for t in data]
+            return [{"id": t.get("id"), "text": t["text"], "link": t["url"], "created_at": t["createdAt"]} for t in data]
         else:
             print(f"❌ Failed to fetch tweets for {username}: {response.status_code}")
             return []
@@ -57,26 +81,194 @@ def fetch_tweets(username, count=5):
         print(f"❌ Twitter fetch error for {username}: {e}")
         return []
 
+def fetch_feed_entries(url, source, conditional=True, known=None):
+    headers = dict(HEADERS, **http_cache.conditional_headers(url)) if conditional else HEADERS
+    response = http_client.stream(url, headers=headers, timeout=15)
+    try:
+        if response.status_code == 304:
+            # Nothing new since last refresh: skip parsing and processing
+            http_cache.not_modified(url)
+            print(f"⏸️ {source} not modified, skipping.")
+            return [], None
+
+        # Entries we already hold whose raw XML hasn't changed skip sanitizing entirely;
+        # they come back with content None, meaning "same as the stored post"
+        known = known or {}
+        previous = http_cache.stored(url, "items", {})
+        reader = FeedReader(response, skip=lambda link, digest: previous.get(link) == digest and bool(known.get(link, {}).get("content_hash")))
+        entries, digests = [], {}
+        for link, digest, entry in reader:
+            if digest:
+                digests[link] = digest
+            if entry is None:
+                entries.append((None, link, known[link].get("published")))
+                continue
+            title = getattr(entry, "title", "").strip()
+            summary = getattr(entry, "summary", "") or getattr(entry, "description", "")
+            published = getattr(entry, "published", None)
+            content = summary if source == "White House" else title
+            entries.append((content, link, published))
+    finally:
+        response.close()
+
+    # Saved only once run_main has processed the entries; a source dropped at its
+    # deadline or left incomplete must not get a 304 next time
+    return entries, partial(http_cache.remember, url, response, size=reader.bytes_read, keep=True, items=digests)
+
+def fetch_tweet_entries(username, source, conditional=True):
+    cursor = tweet_cursors.get(username) if conditional else None
+    if tweet_cursors.is_fresh(cursor):
+        tweet_cursors.count("calls_saved")
+        print(f"⏸️ {source} checked moments ago, skipping.")
+        return [], None
+
+    tweets = fetch_tweets(username)
+    tweet_cursors.count("calls")
+    if not tweets:
+        return [], None
+
+    # Only tweets newer than the last one we saw go on to process_entry
+    fresh = tweet_cursors.newer_than(tweets, cursor)
+    tweet_cursors.count("tweets_new", len(fresh))
+    tweet_cursors.count("tweets_skipped", len(tweets) - len(fresh))
+    # The cursor moves only once run_main has processed these, like feed validators
+    return [(t["text"], t["link"], t["created_at"]) for t in fresh], partial(tweet_cursors.advance, username, tweets)
+
+def forget_sources(sources):
+    """Make the next refresh fetch `sources` in full: no 304s, cursors or schedule waits."""
+    for url, source in rss_feeds:
+        if source in sources:
+            http_cache.forget(url)
+    for username, source in twitter_accounts:
+        if source in sources:
+            tweet_cursors.forget(username)
+    for source in sources:
+        source_schedule.forget(source)
+
+def all_sources():
+    return [source for _, source in rss_feeds] + [source for _, source in twitter_accounts]
+
+def fill_weak_entries(entries, source, deleted=()):
+    """Swap weak feed text for the text of the post's page.
+
+    Returns (entries, complete). Posts still without usable text are dropped,
+    except White House ones, which go through as they are. `complete` is
+    False when a page couldn't be fetched at all.
+    """
+    filled, complete = [], True
+    for content, link, published in entries:
+        if content is None or link in deleted or not is_useless_content(content):
+            filled.append((content, link, published))
+            continue
+        print(f"🔍 Weak content from {source}, fetching page {link}")
+        page = fetch_page_text(link)
+        if not is_useless_content(page):
+            filled.append((page, link, published))
+        elif source == "White House":
+            print("⚠️ Weak White House post, but allowing through.")
+            filled.append((content, link, published))
+        else:
+            if page is None:
+                complete = False
+            print("🚫 Skipping post: No usable content found (non-WH source).")
+            metrics.inc("feed_posts_total", outcome="no_content")
+    return filled, complete
+
+def fetch_all_sources(max_workers=None, deadline=None, conditional=True, known=None, sources=None, deleted=None):
+    """Fetch every RSS feed and X account (or just `sources`) in parallel.
+
+    Yields (source, entries, commit) as each source finishes, so callers can
+    start processing before the slowest source is done. `commit` (or None)
+    saves the source's validators, or forgets them when a page couldn't be
+    fetched, and is meant to be called once its entries are processed. Page
+    fallbacks for weak entries run inside the source's job, so a source that
+    fails or runs past its deadline, pages included, is dropped without
+    affecting the others. Every outcome feeds the source's polling schedule.
+    """
+    max_workers = max_workers or FETCH_CONCURRENCY
+    deadline = deadline or SOURCE_DEADLINE
+    wanted = set(all_sources() if sources is None else sources)
+
+    jobs = [(source, partial(fetch_feed_entries, url, source, conditional, known)) for url, source in rss_feeds if source in wanted]
+    jobs += [(source, partial(fetch_tweet_entries, username, source, conditional)) for username, source in twitter_accounts if source in wanted]
+
+    started = {}
+
+    def run(source, fetch):
+        started[source] = time.monotonic()
+        with metrics.span("feed_source_seconds", run_field="sources", run_key=source, source=source):
+            entries, commit = fetch()
+            entries, complete = fill_weak_entries(entries, source, deleted or ())
+        if not complete:
+            # The page may be back next time, so the source mustn't look unchanged
+            print(f"↩️ {source} had posts that couldn't be fetched, will fetch it in full next time")
+            commit = partial(forget_sources, {source})
+        return entries, commit
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+    pending = {pool.submit(run, source, fetch): source for source, fetch in jobs}
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    entries, commit = future.result()
+                except Exception as e:
+                    print(f"❌ Failed to fetch {source}: {e}")
+                    metrics.inc("feed_source_errors_total", source=source, reason="error")
+                    source_schedule.record(source, error=True)
+                    continue
+                metrics.inc("feed_entries_total", len(entries), source=source)
+                source_schedule.record(source, [published for _, _, published in entries])
+                yield source, entries, commit
+
+            now = time.monotonic()
+            for future, source in list(pending.items()):
+                if source in started and now - started[source] > deadline:
+                    print(f"⏱️ {source} exceeded {deadline:g}s deadline, skipping.")
+                    metrics.inc("feed_source_errors_total", source=source, reason="deadline")
+                    source_schedule.record(source, error=True)
+                    future.cancel()
+                    del pending[future]
+    finally:
+        # Don't block the refresh on stragglers; their results are discarded
+        pool.shutdown(wait=False, cancel_futures=True)
+
 def fetch_page_text(url):
+    with metrics.span("feed_page_fetch_seconds"):
+        return _fetch_page_text(url)
+
+def _fetch_page_text(url):
+    # None when the page couldn't be fetched, "" when it had no usable text
     try:
-        res = requests.get(url, headers=HEADERS, timeout=6)
-        soup = BeautifulSoup(res.text, "html.parser")
-        paragraphs = soup.find_all("p")
-        return " ".join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True)).strip()
+        res = http_client.stream(url, headers=dict(HEADERS, **http_cache.conditional_headers(url)), timeout=6)
+        try:
+            if res.status_code == 304:
+                return http_cache.not_modified(url).get("text", "")
+            # Stops reading once enough paragraph text is in hand
+            text, size = stream_paragraphs_text(res)
+        finally:
+            res.close()
+        if res.status_code != 200:
+            print(f"⚠️ Could not fetch {url}: {res.status_code}")
+            return None
+        http_cache.remember(url, res, size=size, text=text)
+        return text
     except Exception as e:
         print(f"⚠️ Could not extract HTML content from {url}: {e}")
-        return ""
+        return None
 
 def is_useless_content(text):
     if not text or text.strip() == "":
         return True
-    plain = BeautifulSoup(text, "html.parser").get_text(strip=True)
+    # Page text is already plain; only feed HTML needs its tags stripped
+    plain = html_to_text(text) if "<" in text or "&" in text else text.strip()
     return not plain or len(plain.split()) < 5
 
-def analyze_post(text, source=""):
-    try:
-        if source == "Truth Social":
-            system_prompt = """You are summarizing communications from President Trump. Follow these rules:
+def analysis_prompt(source):
+    if source == "Truth Social":
+        return """You are summarizing communications from President Trump. Follow these rules:
 - Always refer to him as 'President Trump', not 'the author' or 'this post'.
 - Be direct, use active phrasing, and summarize as if for political and market analysts.
 - Avoid vague or generic phrases. Assume readers are professionals.
@@ -88,8 +280,7 @@ Return only this JSON:
   \"sentiment\": \"...\",
   \"impact\": X
 }"""
-        else:
-            system_prompt = """You are a geopolitical and financial analyst summarizing official government communications, policy statements, and regulatory developments.
+    return """You are a geopolitical and financial analyst summarizing official government communications, policy statements, and regulatory developments.
 
 Summarize the key points in 3–4 compact, high-signal sentences. The entire summary must stay under 200 characters total. Use direct, factual language. Do not include vague phrasing, commentary, or refer to 'the content' or 'the author'. Use active voice and name government entities when relevant.
 
@@ -102,107 +293,281 @@ Return only this JSON:
   \"impact\": X
 }"""
 
+def batch_prompt(source):
+    # Same rules as the single-post prompt, with the schema keyed by post id
+    rules = analysis_prompt(source).split("Return only this JSON")[0].rstrip()
+    return rules + """
+
+You will get a JSON object {"posts": [{"id": "...", "text": "..."}]}. Analyze each post on its own.
+Return only this JSON, with exactly one result per post, using the post's id:
+{
+  "results": [
+    {"id": "...", "headline": "(max 60 characters)", "summary": "...", "tags": ["..."], "sentiment": "...", "impact": X}
+  ]
+}"""
+
+def parse_json_reply(reply):
+    # Tolerate a ```json fence around the object
+    reply = reply.strip()
+    if reply.startswith("```"):
+        reply = reply.strip("`")
+        reply = reply[reply.find("{"):]
+    data = json.loads(reply)
+    if not isinstance(data, dict):
+        raise ValueError("reply is not a JSON object")
+    return data
+
+def validate_analysis(result):
+    """Return the analysis fields of `result`, or raise ValueError saying what's wrong.
+
+    Strict, for batch results: a bad one is simply sent again on its own.
+    """
+    if not isinstance(result, dict):
+        raise ValueError("result is not an object")
+    for field in ("headline", "summary", "sentiment"):
+        if not isinstance(result.get(field), str) or not result[field].strip():
+            raise ValueError(f"missing or empty {field}")
+    tags = result.get("tags")
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("tags must be a list of strings")
+    impact = result.get("impact")
+    if isinstance(impact, bool) or not isinstance(impact, (int, float, dict)):
+        raise ValueError("impact must be a number or an object")
+    return {
+        "headline": result["headline"].strip(),
+        "summary": result["summary"].strip(),
+        "tags": tags,
+        "sentiment": result["sentiment"].strip(),
+        "impact": impact,
+    }
+
+def _impact(value):
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, (int, float, dict)):
+        return value
+    try:
+        number = float(str(value).strip())
+    except ValueError:
+        return 0
+    return int(number) if number.is_integer() else number
+
+def normalize_analysis(result):
+    """Like validate_analysis, but only a missing summary is fatal.
+
+    For the single-post reply, where there's no cheaper retry: numeric-string
+    impacts are converted, a lone tag string becomes a list, and a missing
+    headline, sentiment or impact gets the same default finish_entry uses.
+    """
+    if not isinstance(result, dict):
+        raise ValueError("result is not an object")
+    summary = result.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        raise ValueError("missing or empty summary")
+    headline, sentiment, tags = result.get("headline"), result.get("sentiment"), result.get("tags")
+    if isinstance(tags, str):
+        tags = [tags]
+    elif not isinstance(tags, list):
+        tags = []
+    return {
+        "headline": headline.strip() if isinstance(headline, str) else "",
+        "summary": summary.strip(),
+        "tags": [str(tag).strip() for tag in tags if isinstance(tag, (str, int, float)) and str(tag).strip()],
+        "sentiment": sentiment.strip() if isinstance(sentiment, str) and sentiment.strip() else "Unknown",
+        "impact": _impact(result.get("impact", 0)),
+    }
+
+def parse_analysis(reply):
+    return normalize_analysis(parse_json_reply(reply))
+
+def parse_batch(reply):
+    results = parse_json_reply(reply).get("results")
+    if not isinstance(results, list):
+        raise ValueError("reply has no results list")
+    return results
 
+def is_batchable(text, source):
+    return (source == "Truth Social" or source.startswith("X -")) and len(text) <= LLM_BATCH_MAX_CHARS
 
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Analyze the following post:\n\n{text}"}
-            ],
+def analysis_request(text, source):
+    # (system prompt, user content) of the single-post request, which is also its cache key
+    return analysis_prompt(source), f"Analyze the following post:\n\n{text}"
+
+def analyze_post(text, source=""):
+    try:
+        return chat_completion(
+            *analysis_request(text, source),
             temperature=0.3,
+            parse=parse_analysis,
+            response_format=JSON_OBJECT,
         )
-        return json.loads(response.choices[0].message.content.strip())
     except Exception as e:
         print(f"❌ OpenAI error: {e}")
         return {"summary": f"[ERROR] {e}"}
 
+def _analyze_batch(texts, source):
+    """One request for {id: text}; returns {id: analysis} for the results that validate."""
+    content = json.dumps({"posts": [{"id": i, "text": text} for i, text in texts.items()]}, ensure_ascii=False)
+    results = chat_completion(batch_prompt(source), content, temperature=0.3, parse=parse_batch, response_format=JSON_OBJECT)
+    valid = {}
+    for result in results:
+        i = result.get("id") if isinstance(result, dict) else None
+        if i not in texts or i in valid:
+            continue
+        try:
+            valid[i] = validate_analysis(result)
+        except ValueError as e:
+            print(f"⚠️ Invalid batch result for {i}: {e}")
+            continue
+        # Cached as its single-post reply, so the same text never needs a batch again
+        remember_completion(*analysis_request(texts[i], source), 0.3, json.dumps(valid[i], ensure_ascii=False))
+    return valid
+
+def analyze_posts(texts, source=""):
+    """Analyze several short posts in one request; returns one result per text, in order.
+
+    Texts with a cached single-post reply are answered from it. Results the
+    reply leaves out or gets wrong are retried together once, then one at a
+    time through `analyze_post`.
+    """
+    pending, results = {}, {}
+    for n, text in enumerate(texts):
+        cached = cached_completion(*analysis_request(text, source), 0.3, parse=parse_analysis)
+        if cached is None:
+            pending[f"p{n}"] = text
+        else:
+            results[f"p{n}"] = cached
+    if results:
+        metrics.inc("llm_batch_items_total", len(results), outcome="cached")
+    for outcome in ("batched", "retried"):
+        if len(pending) < 2:
+            break
+        try:
+            done = _analyze_batch(pending, source)
+        except Exception as e:
+            print(f"⚠️ Batch of {len(pending)} posts failed: {e}")
+            break
+        metrics.inc("llm_batch_items_total", len(done), outcome=outcome)
+        results.update(done)
+        pending = {i: text for i, text in pending.items() if i not in done}
+        if not done:
+            # The same request would only get the same (cached) reply
+            break
+    if pending:
+        metrics.inc("llm_batch_items_total", len(pending), outcome="single")
+    for i, text in pending.items():
+        results[i] = analyze_post(text, source)
+    return [results[f"p{n}"] for n in range(len(texts))]
+
 def generate_expanded_summary(text):
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a geopolitical and economic policy analyst. Expand the original summary with deeper detail and institutional context. Avoid generalities, speculation, or editorializing. Do not use phrases like 'the content you provided.' The tone should be neutral and informative. Target length: 120–150 words, and it should be more detailed than the initial summary."},
-                {"role": "user", "content": f"Expand and clarify this content with more depth and any available factual context:\n\n{text}"}
-            ],
+        return chat_completion(
+            "You are a geopolitical and economic policy analyst. Expand the original summary with deeper detail and institutional context. Avoid generalities, speculation, or editorializing. Do not use phrases like 'the content you provided.' The tone should be neutral and informative. Target length: 120–150 words, and it should be more detailed than the initial summary.",
+            f"Expand and clarify this content with more depth and any available factual context:\n\n{text}",
             temperature=0.4,
         )
-        return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"⚠️ Failed to generate expanded summary: {e}")
         return ""
 
-def run_main():
-    json_path = Path("public/summarized_feed.json")
-    json_path.parent.mkdir(parents=True, exist_ok=True)
-    existing_data = {}
-    existing_posts = {}
-
-    if json_path.exists():
+def run_main(progress=None, only_due=False):
+    """Fetch every source, summarize new posts and write the feed.
+
+    `progress(stage, done=None, total=None)`, if given, is called as the run
+    moves through its stages (used by the app's background jobs). With
+    `only_due`, sources whose polling interval hasn't elapsed are left out
+    and keep their stored posts.
+    """
+    if not os.environ.get("OPENAI_API_KEY"):
+        raise RuntimeError("OPENAI_API_KEY is not set; can't summarize posts")
+    run = metrics.start_run()
+    http_cache.reset_stats()
+    tweet_cursors.reset_stats()
+    daily_recap.reset_stats()
+    llm_cache.reset_stats()
+    source_schedule.reset_stats()
+    try:
+        _refresh(run, progress, only_due)
+    except Exception as e:
+        # A failed run still gets its status, stage timings and run_summary.json
+        stage = run.current_stage
+        print(f"❌ Refresh failed during {stage}: {e}")
         try:
-            with open(json_path, "r", encoding="utf-8") as f:
-                loaded = json.load(f)
-                if isinstance(loaded, list):
-                    # Legacy or direct post array (from backup)
-                    existing_posts = {p["link"]: p for p in loaded}
-                elif isinstance(loaded, dict):
-                    existing_posts = {p["link"]: p for p in loaded.get("posts", [])}
-                else:
-                    print("⚠️ Unexpected JSON format. Skipping reuse.")
-                    existing_posts = {}
-        except Exception as e:
-            print(f"⚠️ Failed to load existing JSON: {e}")
+            metrics.finish_run("failed", extra={"error": f"{type(e).__name__}: {e}", "failed_stage": stage, **_run_stats()})
+        except Exception as summary_error:
+            print(f"⚠️ Could not write the run summary: {summary_error}")
+        raise
+
+
+def _run_stats():
+    return {
+        "http_cache": dict(http_cache.stats),
+        "x_accounts": dict(tweet_cursors.stats),
+        "llm_cache": dict(llm_cache.stats),
+        "recap": dict(daily_recap.stats),
+        "schedule": dict(source_schedule.stats),
+    }
 
-    deleted_links_path = Path("public/deleted_links.json")
-    deleted_links = []
-    if deleted_links_path.exists():
-        try:
-            with open(deleted_links_path, "r", encoding="utf-8") as f:
-                deleted_links = json.load(f)
-        except Exception as e:
-            print(f"⚠️ Failed to load deleted links: {e}")
 
-    summarized_entries = []
+def _refresh(run, progress, only_due):
+    def report(stage, done=None, total=None):
+        run.stage(stage)
+        if progress:
+            progress(stage, done, total)
+
+    report("loading")
+
+    json_path = Path("public/summarized_feed.json")
+    existing_posts = store.posts_by_link()
+    deleted_links = store.deleted_links()
+
+    ranker = FeedRanker(existing_posts)
+    llm_queue = SummarizationQueue()
+    # Short posts waiting for a batch, by system prompt
+    batches = {}
+
+    # Cross-source near-duplicates attach to one canonical post instead of being summarized again
+    similar = SimilarityIndex()
+    canonical = {}
+    by_hash = {}
+    for post in existing_posts.values():
+        by_hash.setdefault(post.get("content_hash"), []).append(post)
+        canonical[post["link"]] = post
+    # Signatures were computed when each text was stored
+    for digest, sig in store.iter_signatures(h for h in by_hash if h):
+        for post in by_hash[digest]:
+            similar.add(post["link"], sig, post["source"])
 
     def process_entry(text, link, published, source):
         existing = existing_posts.get(link)
 
         if link in deleted_links:
             print(f"🚫 Skipping deleted post: {link}")
+            metrics.inc("feed_posts_total", outcome="deleted")
             return
 
         # Skip entirely if raw text is the same → saves GPT cost + preserves timestamp
-        if existing and existing.get("raw_content") == text:
-            summarized_entries.append(existing)
+        if existing and (text is None or existing.get("content_hash") == content_hash(text)):
+            ranker.add(existing)
             print(f"♻️ Reused full post for {link} (no change detected)")
+            metrics.inc("feed_posts_total", outcome="reused")
             return
         
         if source != "White House" and re.match(r"\[No Title\] - Post from \w+ \d{1,2}, \d{4}", text.strip()):
             print("🚫 Skipping known generic '[No Title] - Post from ...' post.")
+            metrics.inc("feed_posts_total", outcome="generic_title")
             return
 
-        if is_useless_content(text):
-            print("🔍 Weak content from feed, fetching page...")
-            html_fallback = fetch_page_text(link)
-            if is_useless_content(html_fallback):
-                if source != "White House":
-                    print("🚫 Skipping post: No usable content found (non-WH source).")
-                    return
-                else:
-                    print("⚠️ Weak White House post, but allowing through.")
-            else:
-                text = html_fallback
-
-        print(f"✏️ Sending to GPT: {text[:300]}")
-        result = analyze_post(text, source)
-        if result.get("summary", "").lower().startswith("[error"):
-            print("❌ Skipping post due to GPT error.")
+        sig = signature(text)
+        match = similar.find(sig, source)
+        if match:
+            related = canonical[match].setdefault("related_sources", [])
+            if all(r["link"] != link for r in related):
+                related.append({"source": source, "link": link})
+            print(f"🔁 Near-duplicate of {match}, attached {source} instead of summarizing")
+            metrics.inc("feed_posts_total", outcome="duplicate")
             return
 
-        expanded = ""
-        if source != "Truth Social" and not source.startswith("X -"):
-            expanded = generate_expanded_summary(text)
-
         if existing and "timestamp" in existing:
             final_timestamp = existing["timestamp"]
             final_display = existing.get("display_time", final_timestamp)
@@ -216,104 +581,132 @@ def run_main():
             else:
                 final_timestamp = final_display = datetime.now(timezone.utc).isoformat()
 
-        summarized_entries.append({
-            "title": result.get("headline", ""),
+        post = {
             "link": link,
             "published": published,
-            "summary": result.get("summary", ""),
-            "summary_expanded": expanded,
-            "tags": result.get("tags", []),
-            "sentiment": result.get("sentiment", "Unknown"),
-            "impact": result.get("impact", 0),
             "source": source,
             "timestamp": final_timestamp,
             "display_time": final_display,
             "raw_content": text
-        })
+        }
+        if existing and existing.get("related_sources"):
+            post["related_sources"] = list(existing["related_sources"])
+        similar.add(link, sig, source)
+        canonical[link] = post
+
+        print(f"✏️ Queued for GPT: {text[:300]}")
+        metrics.inc("feed_posts_total", outcome="queued")
+        if LLM_BATCH_SIZE > 1 and is_batchable(text, source):
+            # Batched once every source is in, by the prompt they share
+            batches.setdefault(analysis_prompt(source), []).append(post)
+            return
 
-    for url, source in rss_feeds:
+        # Headline and expanded summary run concurrently on the LLM queue
+        calls = [partial(analyze_post, text, source)]
+        if source != "Truth Social" and not source.startswith("X -"):
+            calls.append(partial(generate_expanded_summary, text))
+        calls = [metrics.timed(call, "feed_post_llm_seconds", run_field="post_llm", run_key=link) for call in calls]
+        llm_queue.submit(post, *calls)
+
+    def queue_batches():
+        # Sorted so the same posts always make up the same batches, whichever source finished first
+        for group in batches.values():
+            group.sort(key=lambda p: p["link"])
+            for i in range(0, len(group), LLM_BATCH_SIZE):
+                posts = group[i:i + LLM_BATCH_SIZE]
+                call = partial(analyze_posts, [p["raw_content"] for p in posts], posts[0]["source"])
+                llm_queue.submit_batch(posts, metrics.timed(call, "feed_batch_llm_seconds"))
+
+    def finish_entry(post, results):
+        result = results[0]
+        if result.get("summary", "").lower().startswith("[error"):
+            print(f"❌ Skipping post due to GPT error: {post['link']}")
+            metrics.inc("feed_posts_total", outcome="gpt_error")
+            # Make sure the next refresh doesn't get a 304 or cursor and skip this post (or its duplicates)
+            forget_sources({post["source"]} | {r["source"] for r in post.get("related_sources", [])})
+            return
+
+        expanded = results[1] if len(results) > 1 else ""
+        final = {
+            "title": result.get("headline", ""),
+            "link": post["link"],
+            "published": post["published"],
+            "summary": result.get("summary", ""),
+            "summary_expanded": expanded,
+            "tags": result.get("tags", []),
+            "sentiment": result.get("sentiment", "Unknown"),
+            "impact": result.get("impact", 0),
+            "source": post["source"],
+            "timestamp": post["timestamp"],
+            "display_time": post["display_time"],
+            "raw_content": post["raw_content"]
+        }
+        if post.get("related_sources"):
+            final["related_sources"] = post["related_sources"]
+        metrics.inc("feed_posts_total", outcome="summarized")
+        ranker.add(final)
+
+    # Without an existing feed to fall back on, every source has to be fetched
+    polled = source_schedule.due(all_sources()) if only_due and existing_posts else all_sources()
+    if len(polled) < len(all_sources()):
+        print(f"🗓️ Polling {len(polled)} due sources, {len(all_sources()) - len(polled)} not due yet")
+    total_sources = len(polled)
+    report("fetching", 0, total_sources)
+    # Without an existing feed to fall back on, a 304 or cursor would leave sources empty
+    for done, (source, entries, commit) in enumerate(fetch_all_sources(conditional=bool(existing_posts), known=existing_posts, sources=polled, deleted=deleted_links), 1):
         print(f"\n🌐 Processing feed: {source}")
-        try:
-            feed = feedparser.parse(requests.get(url, headers=HEADERS, timeout=15).content)
-            for entry in feed.entries[:5]:
-                title = getattr(entry, "title", "").strip()
-                summary = getattr(entry, "summary", "") or getattr(entry, "description", "")
-                link = entry.link
-                published = getattr(entry, "published", None)
-                content = summary if source == "White House" else title
+        for content, link, published in entries:
+            with metrics.span("feed_post_seconds", run_field="posts", run_key=link, source=source):
                 process_entry(content, link, published, source)
-        except Exception as e:
-            print(f"❌ Failed to parse feed for {source}: {e}")
-
-    for username, source in twitter_accounts:
-        tweets = fetch_tweets(username)
-        for tweet in tweets:
-            process_entry(tweet["text"], tweet["link"], tweet["created_at"], source)
-
-    all_posts = summarized_entries + [p for l, p in existing_posts.items() if l not in {e["link"] for e in summarized_entries}]
-
-    def sort_key(post):
-        ts = datetime.fromisoformat(post["timestamp"])
-        if post["source"] == "Truth Social" and (datetime.now(timezone.utc) - ts) < timedelta(hours=1):
-            return datetime(9999, 1, 1, tzinfo=timezone.utc)
-        return ts
-
-    all_posts.sort(key=sort_key, reverse=True)
-
-    IS_AUTO_FETCH = len(summarized_entries) > 0
-
-    if IS_AUTO_FETCH:
-        source_buckets = {}
-        for post in all_posts:
-            src = post["source"]
-            if src not in source_buckets:
-                source_buckets[src] = []
-            if len(source_buckets[src]) < 12:
-                source_buckets[src].append(post)
-
-        trimmed_posts = []
-        for bucket in source_buckets.values():
-            trimmed_posts.extend(bucket)
-    else:
-        # Use everything from the restored feed
-        trimmed_posts = list(all_posts)
-
-    trimmed_posts.sort(key=sort_key, reverse=True)
-
-    priority_sources = {"Truth Social", "White House"}
-    priority_posts = [p for p in trimmed_posts if p["source"] in priority_sources][:8]
-    fallback_posts = [p for p in trimmed_posts if p["source"] not in priority_sources]
-    priority_posts += fallback_posts[: (10 - len(priority_posts))]
-
-    def summarize_feed_for_recap(entries):
-        try:
-            text = "\n".join([f"- {e['title']}: {e['summary']}" for e in entries])
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional news summarizer. Recap the day's news in 2–4 insightful sentences."},
-                    {"role": "user", "content": f"Summarize the following:\n{text}"}
-                ],
-                temperature=0.4,
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"❌ Recap generation failed: {e}")
-            return "Recap temporarily unavailable due to processing error."
-
-
-    recap = summarize_feed_for_recap(priority_posts)
-
-    output = {
-        "recap": recap,
-        "recap_time": datetime.now(timezone.utc).strftime("%I:%M %p UTC").lstrip("0"),
-        "posts": trimmed_posts
-    }
-
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4, ensure_ascii=False)
-
-    print(f"\n✅ Saved {len(trimmed_posts)} posts and recap to {json_path}")
+        # Validators and cursors only move once the entries are processed
+        if commit:
+            commit()
+        report("fetching", done, total_sources)
+    queue_batches()
+
+    report("summarizing", 0, len(llm_queue))
+    if len(llm_queue):
+        print(f"\n🧠 Waiting on {len(llm_queue)} GPT jobs...")
+    for done, (post, results) in enumerate(llm_queue.results(), 1):
+        finish_entry(post, results)
+        report("summarizing", done, len(llm_queue))
+
+    report("ranking")
+
+    # Keeps 12 per source when anything was fetched; a restored feed is used whole
+    trimmed_posts = ranker.ranked()
+    priority_posts = select_recap_posts(trimmed_posts)
+
+    report("recap")
+    recap, recap_time, recap_state = daily_recap.build_recap(priority_posts, store.get_meta("recap_state"))
+
+    report("saving")
+    added, updated, removed = store.save_feed(trimmed_posts, recap, recap_time, recap_state=recap_state)
+    store.export_json(json_path)
+    feed_events.publish_changes(added, updated, removed)
+
+    print(f"\n✅ Saved {len(trimmed_posts)} posts and recap to {store.path} ({len(added)} new, {len(updated)} updated, {len(removed)} removed)")
+
+    http_cache.save()
+    tweet_cursors.save()
+    source_schedule.save()
+    print(
+        f"📉 Conditional fetch: {http_cache.stats['not_modified']}/{http_cache.stats['requests']} not modified, "
+        f"{http_cache.stats['bytes_saved'] / 1024:.0f} KB saved, {http_cache.stats['parses_skipped']} parses skipped"
+    )
+
+    print(
+        f"🐦 X accounts: {tweet_cursors.stats['calls']} calls, {tweet_cursors.stats['calls_saved']} saved, "
+        f"{tweet_cursors.stats['tweets_new']} new tweets, {tweet_cursors.stats['tweets_skipped']} already seen"
+    )
+
+    llm_cache.prune()
+    print(f"🗃️ LLM cache: {llm_cache.stats['hits']} hits, {llm_cache.stats['misses']} misses")
+    print(f"📰 Recap: {daily_recap.stats['reused']} reused, {daily_recap.stats['patched']} patched, {daily_recap.stats['full']} regenerated")
+
+    summary = metrics.finish_run(extra={"posts_saved": len(trimmed_posts), **_run_stats()})
+    print(f"⏱️ Refresh took {summary['seconds']:.1f}s, run summary in {metrics.RUN_SUMMARY_PATH}")
 
 if __name__ == "__main__":
-    run_main()
+    import sys
+    run_main(only_due="--due" in sys.argv)